@@ -0,0 +1,29 @@
+"""
+Micro-benchmark de los motores de convolución de twa por tamaño de imagen y de filtro.
+
+Justifica los umbrales de auto_backend_thresholds en data_fusion/a_wavelet/a_wavelet.py.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_backends
+"""
+import time
+import numpy as np
+from data_fusion.a_wavelet.a_wavelet import convolution_backends, select_backend
+
+sizes = [256, 1024, 2048, 4096]
+levels = [0, 4, 6, 8, 10, 12, 15]
+backends = ['separable', 'fft', 'opencv']
+rng = np.random.default_rng(0)
+
+print(f"{'imagen':>10} {'filtro':>7} " + " ".join(f"{name:>10}" for name in backends) + f" {'auto':>10}")
+for size in sizes:
+    image = rng.random((size, size)) * 255
+    for level in levels:
+        times = []
+        for name in backends:
+            start = time.perf_counter()
+            convolution_backends[name](image, level)
+            times.append(time.perf_counter() - start)
+        kernel = 4 * (level + 1) + 1
+        print(f"{f'{size}x{size}':>10} {kernel:>7} " + " ".join(f"{t * 1000:>8.1f}ms" for t in times)
+              + f" {select_backend(image.shape, level):>10}")
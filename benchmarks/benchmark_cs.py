@@ -0,0 +1,35 @@
+"""
+Benchmark de los métodos de sustitución de componentes con el ejecutor por teselas.
+
+Mide el tiempo y el pico de memoria de cada método con el mismo tamaño de tesela.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_cs [tamaño] [tamaño_tesela]
+"""
+import sys
+import time
+import tracemalloc
+import numpy as np
+from data_fusion.cs.cs import cs_methods, band_statistics, fusion_cs
+
+size = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+tile_size = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+rng = np.random.default_rng(0)
+ms = rng.integers(0, 256, (4, size, size)).astype(np.uint8)
+pan = rng.integers(0, 256, (size, size)).astype(np.uint8)
+out = np.empty(ms.shape, dtype=np.float32)
+
+start = time.perf_counter()
+statistics = band_statistics(ms, pan, tile_size)
+print(f"Escena {size}x{size}x4, teselas de {tile_size}; estadísticas: {time.perf_counter() - start:.3f}s")
+# Untimed warm-up so the first method does not pay for lazy imports and first-call setup
+fusion_cs(next(iter(cs_methods)), ms, pan, out, tile_size, statistics=statistics, dtype=np.float32)
+print(f"{'método':>8} {'tiempo':>9} {'pico MB':>9}")
+for method in cs_methods:
+    tracemalloc.start()
+    start = time.perf_counter()
+    fusion_cs(method, ms, pan, out, tile_size, statistics=statistics, dtype=np.float32)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    print(f"{method:>8} {elapsed:>8.3f}s {peak:>9.1f}")
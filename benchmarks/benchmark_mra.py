@@ -0,0 +1,53 @@
+"""
+Comparación de velocidad y calidad de HPF, filtro guiado y MTF-GLP frente a la fusión à trous.
+
+Se simula una escena: la imagen de alta resolución es la referencia, la pancromática es su
+media y la multiespectral se degrada (reducción y ampliación por el factor indicado). Cada
+método se evalúa con el ERGAS espectral y espacial y con el RMSE frente a la referencia.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_mra [tamaño] [factor]
+"""
+import sys
+import time
+import cv2
+import numpy as np
+from data_fusion.a_wavelet.a_wavelet import fusion_twa_multiband
+from data_fusion.hpf.hpf import fusion_hpf_multiband, fusion_guided_multiband
+from data_fusion.glp.glp import fusion_glp_multiband
+from data_fusion.evaluacion.evaluacion_calidad import spectral_ERGAS, spatial_ERGAS
+
+size = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+factor = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+rng = np.random.default_rng(0)
+
+# ========== Escena sintética ==========
+
+noise = rng.random((size, size, 3)).astype(np.float32)
+reference = sum(cv2.GaussianBlur(noise, (0, 0), sigma) * (sigma ** 0.5) for sigma in (1, 4, 16))
+reference = 255 * (reference - reference.min()) / (reference.max() - reference.min())
+pan = reference.mean(axis=2)
+small = cv2.resize(reference, (size // factor, size // factor), interpolation=cv2.INTER_AREA)
+xs = cv2.resize(small, (size, size), interpolation=cv2.INTER_LINEAR).astype(np.float64)
+
+methods = {
+    'à trous (5 niveles, separable)': lambda: fusion_twa_multiband(xs, pan, 5),
+    'à trous (5 niveles, auto)': lambda: fusion_twa_multiband(xs, pan, 5, backend='auto'),
+    'HPF (radio 2)': lambda: fusion_hpf_multiband(xs, pan, 2),
+    'HPF (radio 8)': lambda: fusion_hpf_multiband(xs, pan, 8),
+    'Filtro guiado (radio 2)': lambda: fusion_guided_multiband(xs, pan, 2),
+    'Filtro guiado (radio 8)': lambda: fusion_guided_multiband(xs, pan, 8),
+    'MTF-GLP (2 niveles)': lambda: fusion_glp_multiband(xs, pan, 2),
+    'MTF-GLP (5 niveles)': lambda: fusion_glp_multiband(xs, pan, 5),
+}
+
+print(f"Escena {size}x{size}x3, factor {factor}")
+print(f"{'método':>32} {'tiempo':>9} {'ERGAS-x':>9} {'ERGAS-s':>9} {'RMSE':>8}")
+for name, method in methods.items():
+    start = time.perf_counter()
+    fused = method()
+    elapsed = time.perf_counter() - start
+    ergas_x = spectral_ERGAS(xs, fused, 1/factor, [1, 1, 1], 3)
+    ergas_s = spatial_ERGAS(pan, fused, 1/factor, [1, 1, 1], 3)
+    rmse = np.sqrt(np.mean((fused - reference) ** 2))
+    print(f"{name:>32} {elapsed:>8.3f}s {ergas_x:>9.4f} {ergas_s:>9.4f} {rmse:>8.3f}")
@@ -0,0 +1,37 @@
+"""
+Benchmark de la transformada Wavelet à trous: tiempo por nivel de cada motor de convolución.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.benchmark_twa [tamaño] [niveles]
+"""
+import sys
+import time
+import numpy as np
+from data_fusion.a_wavelet.a_wavelet import convolution_backends, fusion_twa_multiband
+
+size = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+levels = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+rng = np.random.default_rng(0)
+image = rng.integers(0, 256, (size, size)).astype(np.float64)
+
+# ========== Tiempo por nivel ==========
+
+print(f"Imagen {size}x{size}, {levels} niveles")
+print(f"{'nivel':>5} {'filtro':>8} " + " ".join(f"{name:>12}" for name in convolution_backends))
+for level in range(levels):
+    times = []
+    for convolve in convolution_backends.values():
+        start = time.perf_counter()
+        convolve(image, level)
+        times.append(time.perf_counter() - start)
+    kernel = 4 * (level + 1) + 1
+    print(f"{level:>5} {f'{kernel}x{kernel}':>8} " + " ".join(f"{t:>11.3f}s" for t in times))
+
+# ========== Concordancia de la fusión ==========
+
+xs = rng.integers(0, 256, (256, 256, 3)).astype(np.float64)
+pan = rng.integers(0, 256, (256, 256)).astype(np.float64)
+reference = fusion_twa_multiband(xs, pan, levels, backend='dense')
+for name in convolution_backends:
+    fused = fusion_twa_multiband(xs, pan, levels, backend=name)
+    print(f"{name}: diferencia máxima con 'dense' = {np.abs(fused - reference).max():.3e}")
@@ -0,0 +1,77 @@
+"""
+Reporte de la deriva numérica de la fusión en float32 respecto a float64.
+
+Ejecuta IHS y à trous sobre una escena de referencia con ambos tipos de dato y compara
+los resultados en punto flotante, tras la conversión a 8 bits y en el ERGAS.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.drift_float32 [imagen_espectral.tif imagen_espacial.tif [tamaño_ventana]]
+Sin argumentos se usa una escena sintética.
+"""
+import sys
+from math import sqrt
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+from skimage.exposure import match_histograms
+from func.functions import get_pancromatica, resampling_spectral, process_imag_to_another_model
+from data_fusion.ihs.ihs import rgb_to_ihs
+from data_fusion.a_wavelet.a_wavelet import fusion_twa_multiband
+from data_fusion.evaluacion.evaluacion_calidad import spectral_ERGAS, spatial_ERGAS
+
+def load_scene():
+    """
+    Carga la escena de referencia (o una sintética) como en main_fusion.py.
+
+    Returns:
+    - image_rgb: Imagen multiespectral remuestreada (filas, columnas, 3) en uint8.
+    - pancromatica: Pancromática sintética en uint8.
+    """
+    if len(sys.argv) < 3:
+        rng = np.random.default_rng(0)
+        base = rng.integers(0, 256, (512, 512, 3)).astype(np.uint8)
+        return base, base.mean(axis=2).astype(np.uint8)
+    size = int(sys.argv[3]) if len(sys.argv) > 3 else 2048
+    with rasterio.open(sys.argv[2]) as spatial_src, rasterio.open(sys.argv[1]) as spectral_src:
+        inter_spectral, _ = resampling_spectral(spectral_src, spatial_src.height, spatial_src.width, 'bilinear')
+        pancromatica = get_pancromatica(spatial_src)
+    image_rgb = np.transpose(inter_spectral[0:3], (1, 2, 0))
+    window = Window(0, 0, min(size, pancromatica.shape[1]), min(size, pancromatica.shape[0]))
+    rows, cols = window.toslices()
+    return image_rgb[rows, cols], pancromatica[rows, cols]
+
+def run(image_rgb, pancromatica, dtype):
+    """
+    Ejecuta las fusiones IHS y à trous con el tipo de dato indicado.
+
+    Returns:
+    - Diccionario con las imágenes fusionadas por método.
+    """
+    pan = pancromatica.astype(dtype)
+    iv1v2 = rgb_to_ihs(image_rgb, dtype)
+    pan_i = match_histograms(pan, iv1v2[:, :, 0])
+    pan_v1_v2 = iv1v2.copy()
+    pan_v1_v2[:, :, 0] = pan_i
+    mask_matrix_to_rgb = [[1, 1/sqrt(6), 1/sqrt(6)], [1, 1/sqrt(6), -1/2], [1, -2/sqrt(6), 0]]
+    return {
+        'IHS': process_imag_to_another_model(pan_v1_v2, mask_matrix_to_rgb, dtype),
+        'WAV': fusion_twa_multiband(image_rgb, pan_i, 5, dtype=dtype),
+    }
+
+image_rgb, pancromatica = load_scene()
+results_64 = run(image_rgb, pancromatica, np.float64)
+results_32 = run(image_rgb, pancromatica, np.float32)
+
+print(f"Escena {image_rgb.shape[0]}x{image_rgb.shape[1]}")
+print(f"{'método':>6} {'máx |Δ|':>10} {'RMSE':>10} {'Δ uint8 %':>10} {'ERGAS-x 64':>11} {'ERGAS-x 32':>11} "
+      f"{'ERGAS-s 64':>11} {'ERGAS-s 32':>11}")
+for method, fused_64 in results_64.items():
+    fused_32 = results_32[method]
+    diff = fused_32.astype(np.float64) - fused_64
+    changed = np.mean(fused_32.astype('uint8') != fused_64.astype('uint8')) * 100
+    ergas = [spectral_ERGAS(image_rgb, fused_64, 1/2, [1, 1, 1], 3),
+             spectral_ERGAS(image_rgb, fused_32, 1/2, [1, 1, 1], 3, np.float32),
+             spatial_ERGAS(pancromatica, fused_64, 1/2, [1, 1, 1], 3),
+             spatial_ERGAS(pancromatica, fused_32, 1/2, [1, 1, 1], 3, np.float32)]
+    print(f"{method:>6} {np.abs(diff).max():>10.2e} {sqrt(np.mean(diff ** 2)):>10.2e} {changed:>10.4f} "
+          + " ".join(f"{value:>11.6f}" for value in ergas))
@@ -1,6 +1,22 @@
 import numpy as np
 import cv2
+import rasterio
 from scipy import signal
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from data_fusion.tiling.tiling import iter_tiles, read_window
+from data_fusion.conversion.conversion import saturate_cast
+from data_fusion.parallel.parallel import (
+    create_shared_array,
+    attach_shared_array,
+    shared_array_spec,
+    release_shared_array
+)
+try:
+    from data_fusion.a_wavelet.a_wavelet_numba import convolve_numba
+except ImportError:
+    # Numba es opcional: sin él el motor 'numba' no está disponible
+    convolve_numba = None
 
 #Filtro para degradar las imágenes en planos Wavelet
 filtro_5x5 = np.array([
@@ -104,7 +120,258 @@ def put_n_rows_of_zeros(matrix, n):
         result = np.concatenate((result, zeros, [matrix[i]]))
     return result
 
-def twa(arr1, levels, init_level=0):
+# Factor 1-D del filtro base: base_filter = np.outer(base_filter_1d, base_filter_1d)
+base_filter_1d = 1/16 * np.array([1, 4, 6, 4, 1])
+
+class FilterBank:
+    """
+    Banco de filtros à trous memorizado.
+
+    Guarda cada filtro por (filtro base, nivel, tipo de dato) la primera vez que se pide, de modo
+    que las bandas, la pancromática y las escenas de un mismo proceso reutilizan los mismos
+    arreglos. Los arreglos devueltos son de solo lectura.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def _get(self, kind, base, level, dtype, build):
+        base = np.asarray(base)
+        dtype = np.dtype(dtype)
+        key = (kind, base.shape, base.dtype.str, base.tobytes(), level, dtype.str)
+        kernel = self._cache.get(key)
+        if kernel is None:
+            kernel = np.array(build(base), dtype=dtype)
+            kernel.setflags(write=False)
+            self._cache[key] = kernel
+        return kernel
+
+    def dense(self, level, base=base_filter, dtype=np.float64):
+        """
+        Obtiene el filtro 2D del nivel con los ceros intercalados (resultado de obtain_filter).
+
+        Parameters:
+        - level: Nivel de la transformada.
+        - base: Filtro base 2D (por defecto base_filter).
+        - dtype: Tipo de dato del filtro (por defecto np.float64).
+
+        Returns:
+        - Filtro 2D de solo lectura.
+        """
+        return self._get('dense', base, level, dtype, lambda b: obtain_filter(level, b))
+
+    def dilated(self, level, base=base_filter_1d, dtype=np.float64):
+        """
+        Obtiene el factor 1-D del filtro del nivel con los ceros intercalados.
+
+        Parameters:
+        - level: Nivel de la transformada.
+        - base: Filtro base 1-D (por defecto base_filter_1d).
+        - dtype: Tipo de dato del filtro (por defecto np.float64).
+
+        Returns:
+        - Filtro 1-D de solo lectura de longitud (len(base)-1)*(level+1)+1.
+        """
+        def build(b):
+            kernel = np.zeros((len(b) - 1) * (level + 1) + 1)
+            kernel[::level + 1] = b
+            return kernel
+        return self._get('dilated', base, level, dtype, build)
+
+    def taps(self, base=base_filter_1d, dtype=np.float64):
+        """
+        Obtiene las tomas no nulas del filtro base 1-D, comunes a todos los niveles.
+
+        Parameters:
+        - base: Filtro base 1-D (por defecto base_filter_1d).
+        - dtype: Tipo de dato del filtro (por defecto np.float64).
+
+        Returns:
+        - Filtro 1-D de solo lectura.
+        """
+        return self._get('taps', base, None, dtype, lambda b: b)
+
+    def clear(self):
+        """
+        Vacía el banco de filtros.
+        """
+        self._cache.clear()
+
+# Banco de filtros compartido por todos los motores de convolución
+filter_bank = FilterBank()
+
+def _correlate_dilated_1d(arr, kernel, step, axis, out):
+    """
+    Aplica una pasada 1-D dilatada a lo largo de un eje, recorriendo solo las tomas no nulas.
+
+    Los píxeles fuera de la imagen se consideran cero, igual que signal.convolve2d(mode='same').
+
+    Parameters:
+    - arr: Imagen de entrada (2D).
+    - kernel: Filtro 1-D simétrico de longitud impar.
+    - step: Separación entre tomas (número de ceros insertados + 1).
+    - axis: Eje sobre el que se aplica el filtro.
+    - out: Arreglo de salida con la misma forma que arr.
+
+    Returns:
+    - out: Imagen filtrada.
+    """
+    n = arr.shape[axis]
+    radius = len(kernel) // 2
+    np.multiply(arr, kernel[radius], out=out)
+    for k, weight in enumerate(kernel):
+        shift = (k - radius) * step
+        if shift == 0 or abs(shift) >= n:
+            continue
+        dst = [slice(None)] * arr.ndim
+        src = [slice(None)] * arr.ndim
+        if shift > 0:
+            dst[axis], src[axis] = slice(0, n - shift), slice(shift, n)
+        else:
+            dst[axis], src[axis] = slice(-shift, n), slice(0, n + shift)
+        out[tuple(dst)] += weight * arr[tuple(src)]
+    return out
+
+def _as_float(arr):
+    """
+    Devuelve la imagen sin copiar si ya es de punto flotante, o convertida a float64 si no lo es.
+
+    Parameters:
+    - arr: Imagen de entrada.
+
+    Returns:
+    - Imagen de punto flotante.
+    """
+    arr = np.asarray(arr)
+    return arr if np.issubdtype(arr.dtype, np.floating) else arr.astype(np.float64)
+
+def _convolve_dense(arr, level):
+    """
+    Degrada la imagen con el filtro denso de obtain_filter (implementación original).
+
+    Parameters:
+    - arr: Imagen de entrada (2D).
+    - level: Nivel de la transformada.
+
+    Returns:
+    - Imagen degradada.
+    """
+    arr = _as_float(arr)
+    return signal.convolve2d(arr, filter_bank.dense(level, dtype=arr.dtype), mode='same')
+
+def _convolve_separable(arr, level):
+    """
+    Degrada la imagen con dos pasadas 1-D dilatadas (filas y columnas) del filtro base.
+
+    Equivale a _convolve_dense porque el filtro B3-spline es separable, pero el costo
+    por nivel es constante (10 tomas por píxel) en lugar de crecer con el tamaño del filtro.
+
+    Parameters:
+    - arr: Imagen de entrada (2D).
+    - level: Nivel de la transformada.
+
+    Returns:
+    - Imagen degradada.
+    """
+    arr = _as_float(arr)
+    kernel = filter_bank.taps(dtype=arr.dtype)
+    rows = _correlate_dilated_1d(arr, kernel, level + 1, 1, np.empty_like(arr))
+    return _correlate_dilated_1d(rows, kernel, level + 1, 0, np.empty_like(arr))
+
+def _convolve_fft(arr, level):
+    """
+    Degrada la imagen con dos convoluciones 1-D por FFT con solapamiento-suma (scipy.signal.oaconvolve).
+
+    Parameters:
+    - arr: Imagen de entrada (2D).
+    - level: Nivel de la transformada.
+
+    Returns:
+    - Imagen degradada.
+    """
+    arr = _as_float(arr)
+    kernel = filter_bank.dilated(level, dtype=arr.dtype)
+    rows = signal.oaconvolve(arr, kernel[np.newaxis,:], mode='same', axes=1)
+    return signal.oaconvolve(rows, kernel[:,np.newaxis], mode='same', axes=0)
+
+def _convolve_opencv(arr, level):
+    """
+    Degrada la imagen con el filtro separable de OpenCV (cv2.sepFilter2D) y borde en cero.
+
+    Parameters:
+    - arr: Imagen de entrada (2D).
+    - level: Nivel de la transformada.
+
+    Returns:
+    - Imagen degradada.
+    """
+    arr = _as_float(arr)
+    kernel = filter_bank.dilated(level, dtype=arr.dtype)
+    return cv2.sepFilter2D(arr, -1, kernel, kernel, borderType=cv2.BORDER_CONSTANT)
+
+def _convolve_numba(arr, level):
+    """
+    Degrada la imagen con las pasadas 1-D dilatadas compiladas con Numba (sin imágenes con relleno).
+
+    Parameters:
+    - arr: Imagen de entrada (2D).
+    - level: Nivel de la transformada.
+
+    Returns:
+    - Imagen degradada.
+    """
+    if convolve_numba is None:
+        raise ImportError("El motor 'numba' requiere instalar numba")
+    arr = _as_float(arr)
+    return convolve_numba(arr, filter_bank.taps(dtype=arr.dtype), level + 1)
+
+# Umbrales de la política automática: (píxeles mínimos de la imagen, longitud máxima del filtro
+# 1-D para usar OpenCV). Medidos con benchmarks/benchmark_backends.py: cv2.sepFilter2D gana
+# mientras el filtro es corto y 'separable' (costo constante por nivel) a partir de ahí; la FFT
+# no gana en ningún caso porque los filtros separables siguen siendo cortos.
+auto_backend_thresholds = ((2048 * 2048, 49), (512 * 512, 41), (0, 29))
+
+def select_backend(shape, level):
+    """
+    Elige el motor de convolución más rápido según el tamaño de la imagen y del filtro del nivel.
+
+    Parameters:
+    - shape: Forma de la imagen.
+    - level: Nivel de la transformada.
+
+    Returns:
+    - Nombre del motor en convolution_backends.
+    """
+    pixels = shape[0] * shape[1]
+    kernel_size = 4 * (level + 1) + 1
+    for min_pixels, max_kernel in auto_backend_thresholds:
+        if pixels >= min_pixels:
+            return 'opencv' if kernel_size <= max_kernel else 'separable'
+
+def _convolve_auto(arr, level):
+    """
+    Degrada la imagen con el motor elegido por select_backend.
+
+    Parameters:
+    - arr: Imagen de entrada (2D).
+    - level: Nivel de la transformada.
+
+    Returns:
+    - Imagen degradada.
+    """
+    return convolution_backends[select_backend(arr.shape, level)](arr, level)
+
+# Motores de convolución disponibles para twa
+convolution_backends = {
+    'dense': _convolve_dense,
+    'separable': _convolve_separable,
+    'fft': _convolve_fft,
+    'opencv': _convolve_opencv,
+    'auto': _convolve_auto,
+    'numba': _convolve_numba,
+}
+
+def twa(arr1, levels, init_level=0, backend='separable', accumulate=False, out=None, dtype=np.float64):
     """
     Aplica la transformada Wavelet à trous a una imagen.
 
@@ -112,29 +379,70 @@ def twa(arr1, levels, init_level=0):
     - arr1: Imagen de entrada a la cual se aplicará la transformada.
     - levels: Número de niveles de resolución para aplicar la transformada.
     - init_level: Nivel inicial para comenzar la degradación (por defecto es 0).
+    - backend: Motor de convolución, una clave de convolution_backends (por defecto 'separable').
+    - accumulate: Si es True, los planos Wavelet se suman en un único acumulador 2D en lugar
+      de guardarse por nivel, así solo se mantienen en memoria unas tres imágenes completas.
+    - out: Acumulador 2D opcional (float) donde se escribe la suma cuando accumulate es True.
+    - dtype: Tipo de dato de punto flotante del cálculo (por defecto np.float64).
 
     Returns:
-    - coefs: Coeficientes de la transformada Wavelet à trous.
+    - coefs: Coeficientes de la transformada Wavelet à trous, o su suma si accumulate es True.
     - current_degradation: Imagen degradada en el último nivel de la transformada.
     """
+    if backend not in convolution_backends:
+        raise ValueError(f"Motor de convolución desconocido: {backend}")
+    convolve = convolution_backends[backend]
     # Init variables
-    previous_degradation = np.array(arr1)
+    previous_degradation = np.asarray(arr1, dtype=dtype)
     current_degradation = []
-    coefs = np.empty([arr1.shape[0],arr1.shape[1],0])
+    if accumulate:
+        if out is None:
+            out = np.zeros(arr1.shape[:2], dtype=dtype)
+        else:
+            out[...] = 0
+        coefs = out
+    else:
+        coefs = np.empty([arr1.shape[0],arr1.shape[1],0], dtype=dtype)
     # Apply levels - init_level degradations
     for level in range(init_level, levels):
-        # Obtain the filter for each level
-        a_trous_filter = obtain_filter(level)
-        # Convolution between the image and the filter
-        current_degradation = signal.convolve2d(previous_degradation, a_trous_filter, mode='same')
+        # Convolution between the image and the filter of each level
+        current_degradation = convolve(previous_degradation, level)
         # Obtain the wavelet coefficients
-        current_coef = previous_degradation-current_degradation
-        current_coef = np.expand_dims(current_coef, axis=2)
-        coefs = np.append(coefs, current_coef, axis=2)
+        if accumulate:
+            # Add the coefficient in place, without building the plane
+            np.add(coefs, previous_degradation, out=coefs)
+            np.subtract(coefs, current_degradation, out=coefs)
+        else:
+            current_coef = previous_degradation-current_degradation
+            current_coef = np.expand_dims(current_coef, axis=2)
+            coefs = np.append(coefs, current_coef, axis=2)
         previous_degradation = current_degradation
     return coefs, current_degradation
 
-def fusion_twa_multiband(xs, pan, levels, init_level=0):
+def twa_detail(pan, levels, init_level=0, backend='separable', out=None, dtype=np.float64):
+    """
+    Obtiene el detalle espacial de la imagen pancromática: la suma de sus planos Wavelet à trous.
+
+    Se calcula una sola vez por fusión y se inyecta en cada banda multiespectral, de modo que
+    puede reutilizarse en otros métodos de fusión.
+
+    Parameters:
+    - pan: Imagen pancromática (2D, o 3D de la que se usa la primera banda).
+    - levels: Número de niveles de resolución para la transformada.
+    - init_level: Nivel inicial para comenzar la degradación (por defecto es 0).
+    - backend: Motor de convolución usado por twa (por defecto 'separable').
+    - out: Arreglo 2D opcional donde se escribe el detalle.
+    - dtype: Tipo de dato de punto flotante del cálculo (por defecto np.float64).
+
+    Returns:
+    - detail: Suma de los coeficientes Wavelet de la imagen pancromática (2D).
+    """
+    if pan.ndim > 2:
+        pan = pan[:,:,0]
+    detail, _ = twa(pan, levels, init_level, backend=backend, accumulate=True, out=out, dtype=dtype)
+    return detail
+
+def fusion_twa_multiband(xs, pan, levels, init_level=0, backend='separable', workers=1, dtype=np.float64):
     """
     Fusiona imágenes multibanda utilizando la transformada Wavelet à trous.
 
@@ -143,27 +451,106 @@ def fusion_twa_multiband(xs, pan, levels, init_level=0):
     - pan: Imagen pancromática utilizada para la fusión.
     - levels: Número de niveles de resolución para la transformada.
     - init_level: Nivel inicial para comenzar la degradación (por defecto es 0).
+    - backend: Motor de convolución usado por twa (por defecto 'separable').
+    - workers: Número de procesos para repartir las bandas; con 1 la fusión es secuencial.
+      Los procesos se inician con 'spawn', que vuelve a importar el script principal: el
+      script que llame con workers > 1 debe proteger su código con
+      if __name__ == "__main__":, o cada proceso fallará al iniciarse.
+    - dtype: Tipo de dato de punto flotante de la fusión, p. ej. np.float32 para reducir
+      a la mitad la memoria (por defecto np.float64).
 
     Returns:
     - fused_image: Imagen fusionada.
     """
-    # Initialize image
-    fused_image = np.empty([xs.shape[0], xs.shape[1], 0])
     # If the panchromatic image has more than one band, we use the first
     if pan.ndim > 2:
         pan = pan[:,:,0]
     # If the multispectral image has 3 bands or more, we start the fusion
     if xs.ndim > 2:
+        if workers > 1:
+            return _fusion_twa_multiband_parallel(xs, pan, levels, backend, workers, dtype)
+        # Initialize image
+        fused_image = np.empty(xs.shape, dtype=dtype)
+        # The panchromatic detail is shared by every band, so it is computed once
+        detail_pan = twa_detail(pan, levels, backend=backend, dtype=dtype)
         for nBand in range(xs.shape[2]):
-            img_nBand = fusion_twa_single_band(xs[:,:,nBand], pan, levels)
-            img_nBand = np.expand_dims(img_nBand, axis=2)
-            fused_image = np.append(fused_image, img_nBand, axis=2)
+            fused_image[:,:,nBand] = fusion_twa_single_band(xs[:,:,nBand], pan, levels, backend=backend,
+                                                            detail_pan=detail_pan, dtype=dtype)
     else:
         print("The first argument must have the shape (x,y,z), received: " + str(xs.shape))
         fused_image = None
     return fused_image
 
-def fusion_twa_single_band(xs, pan, levels, init_level=0):
+def _twa_shared_worker(src_spec, dst_spec, band, levels, backend, dtype):
+    """
+    Trabajador de _fusion_twa_multiband_parallel: procesa una banda desde memoria compartida.
+
+    Con band=None calcula el detalle de la pancromática (2D); con un índice de banda escribe
+    la degradación de esa banda en la imagen de salida.
+
+    Parameters:
+    - src_spec: Descripción del arreglo compartido de entrada.
+    - dst_spec: Descripción del arreglo compartido de salida.
+    - band: Índice de la banda a degradar, o None para el detalle de la pancromática.
+    - levels: Número de niveles de resolución para la transformada.
+    - backend: Motor de convolución usado por twa.
+    - dtype: Tipo de dato de punto flotante del cálculo.
+
+    Returns:
+    - None
+    """
+    src_shm, src = attach_shared_array(src_spec)
+    dst_shm, dst = attach_shared_array(dst_spec)
+    try:
+        if band is None:
+            twa_detail(src, levels, backend=backend, out=dst, dtype=dtype)
+        else:
+            _, dst[:,:,band] = twa(src[:,:,band], levels, backend=backend, dtype=dtype)
+    finally:
+        del src, dst
+        src_shm.close()
+        dst_shm.close()
+
+def _fusion_twa_multiband_parallel(xs, pan, levels, backend, workers, dtype):
+    """
+    Reparte la fusión à trous en un pool de procesos usando memoria compartida.
+
+    El detalle de la pancromática y la degradación de cada banda se calculan en paralelo y
+    se escriben en arreglos compartidos preasignados; al final el detalle se suma a todas
+    las bandas, con el mismo resultado que la fusión secuencial.
+
+    Parameters:
+    - xs: Imágenes multibanda a fusionar (tensor tridimensional).
+    - pan: Imagen pancromática 2D.
+    - levels: Número de niveles de resolución para la transformada.
+    - backend: Motor de convolución usado por twa.
+    - workers: Número de procesos.
+    - dtype: Tipo de dato de punto flotante del cálculo.
+
+    Returns:
+    - fused_image: Imagen fusionada.
+    """
+    shms, arrays = zip(create_shared_array(xs.shape, xs.dtype, xs),
+                       create_shared_array(pan.shape, pan.dtype, pan),
+                       create_shared_array(xs.shape, dtype),
+                       create_shared_array(pan.shape, dtype))
+    try:
+        xs_spec, pan_spec, out_spec, detail_spec = map(shared_array_spec, shms, arrays)
+        # Spawned workers do not inherit the thread pools of numba or OpenCV, which deadlock after fork
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(_twa_shared_worker, pan_spec, detail_spec, None, levels, backend, dtype)]
+            futures += [pool.submit(_twa_shared_worker, xs_spec, out_spec, nBand, levels, backend, dtype)
+                        for nBand in range(xs.shape[2])]
+            for future in futures:
+                future.result()
+        # The detail is added while copying out of shared memory, in a single pass over the output
+        return arrays[2] + arrays[3][:,:,np.newaxis]
+    finally:
+        del arrays
+        for shm in shms:
+            release_shared_array(shm)
+
+def fusion_twa_single_band(xs, pan, levels, init_level=0, backend='separable', detail_pan=None, dtype=np.float64):
     """
     Fusiona una banda específica utilizando la transformada Wavelet à trous.
 
@@ -172,16 +559,146 @@ def fusion_twa_single_band(xs, pan, levels, init_level=0):
     - pan: Imagen pancromática utilizada para la fusión.
     - levels: Número de niveles de resolución para la transformada.
     - init_level: Nivel inicial para comenzar la degradación (por defecto es 0).
+    - backend: Motor de convolución usado por twa (por defecto 'separable').
+    - detail_pan: Detalle precalculado con twa_detail; si es None se calcula a partir de pan.
+    - dtype: Tipo de dato de punto flotante del cálculo (por defecto np.float64).
 
     Returns:
     - fused_band: Banda fusionada.
     """
     # Apply wavelet a trous to both bands, obtain the degradated band of the multiespectral band,
     # and the wavelet coefficients of the panchromatic image
-    _, f_xs = twa(xs, levels)
-    c_pan, _ = twa(pan, levels)
+    _, f_xs = twa(xs, levels, backend=backend, dtype=dtype)
     # Add the coefficients
-    coef_pan = np.sum(c_pan, axis=2)
+    coef_pan = detail_pan if detail_pan is not None else twa_detail(pan, levels, backend=backend, dtype=dtype)
     # Obtain the fused band
     fused_band = f_xs + coef_pan
     return fused_band
+
+def fusion_twa_sweep(xs, pan, levels, backend='separable', dtype=np.float64, evaluate=False,
+                     ratio=1/2, coef_rad=None, dst_pattern=None, metadata=None):
+    """
+    Obtiene la fusión à trous para cada número de niveles 1..levels con una sola descomposición.
+
+    El detalle de la pancromática es acumulativo, así que cada nivel agrega un plano al detalle y
+    degrada una vez más cada banda; la fusión con n niveles es idéntica a
+    fusion_twa_multiband(xs, pan, n).
+
+    Parameters:
+    - xs: Imágenes multibanda a fusionar (tensor tridimensional).
+    - pan: Imagen pancromática utilizada para la fusión.
+    - levels: Número máximo de niveles de resolución.
+    - backend: Motor de convolución usado por twa (por defecto 'separable').
+    - dtype: Tipo de dato de punto flotante del cálculo (por defecto np.float64).
+    - evaluate: Si es True, calcula el ERGAS espectral (frente a xs) y espacial (frente a pan) de cada nivel.
+    - ratio: Ratio de escala usado en el ERGAS (por defecto 1/2).
+    - coef_rad: Coeficientes de radiancia por banda para el ERGAS (por defecto 1).
+    - dst_pattern: Ruta opcional con '{level}' donde se escribe cada fusión como GeoTIFF.
+    - metadata: Metadatos de rasterio para escribir las fusiones (requerido con dst_pattern).
+
+    Returns:
+    - Generador de tuplas (nivel, imagen fusionada, índices), donde índices es un diccionario
+      con los ERGAS o None si evaluate es False.
+    """
+    if backend not in convolution_backends:
+        raise ValueError(f"Motor de convolución desconocido: {backend}")
+    if dst_pattern is not None and metadata is None:
+        raise ValueError("Se requieren los metadatos para escribir las fusiones")
+    convolve = convolution_backends[backend]
+    if pan.ndim > 2:
+        pan = pan[:,:,0]
+    n_band = xs.shape[2]
+    if coef_rad is None:
+        coef_rad = [1] * n_band
+    previous_pan = np.asarray(pan, dtype=dtype)
+    detail_pan = np.zeros(pan.shape, dtype=dtype)
+    approx_bands = [np.asarray(xs[:,:,nBand], dtype=dtype) for nBand in range(n_band)]
+    for level in range(levels):
+        # Add the detail plane of this level, as in twa(accumulate=True)
+        current_pan = convolve(previous_pan, level)
+        np.add(detail_pan, previous_pan, out=detail_pan)
+        np.subtract(detail_pan, current_pan, out=detail_pan)
+        previous_pan = current_pan
+        # Degrade every band one more level and inject the accumulated detail
+        fused_image = np.empty(xs.shape, dtype=dtype)
+        for nBand in range(n_band):
+            approx_bands[nBand] = convolve(approx_bands[nBand], level)
+            fused_image[:,:,nBand] = approx_bands[nBand] + detail_pan
+        scores = None
+        if evaluate:
+            # Imported here so the wavelet module does not require sewar
+            from data_fusion.evaluacion.evaluacion_calidad import spectral_ERGAS, spatial_ERGAS
+            scores = {
+                'ERGAS espectral': spectral_ERGAS(xs, fused_image, ratio, coef_rad, n_band, dtype),
+                'ERGAS espacial': spatial_ERGAS(pan, fused_image, ratio, coef_rad, n_band, dtype),
+            }
+        if dst_pattern is not None:
+            with rasterio.open(dst_pattern.format(level=level + 1), 'w', **metadata) as dst:
+                for ix in range(n_band):
+                    dst.write(fused_image[:,:,ix], ix+1)
+        yield level + 1, fused_image, scores
+
+def twa_halo(levels, init_level=0):
+    """
+    Obtiene el soporte (radio en píxeles) de la transformada à trous acumulada hasta el último nivel.
+
+    Una tesela leída con este margen produce en su interior exactamente los mismos valores
+    que la imagen completa.
+
+    Parameters:
+    - levels: Número de niveles de resolución para la transformada.
+    - init_level: Nivel inicial para comenzar la degradación (por defecto es 0).
+
+    Returns:
+    - halo: Número de píxeles de solapamiento necesarios a cada lado.
+    """
+    # The filter of each level has 5 taps separated by level + 1 pixels
+    return sum(2 * (level + 1) for level in range(init_level, levels))
+
+def fusion_twa_tiled(spectral_src, pan_src, dst_path, levels, tile_size=1024, backend='separable',
+                     indexes=None, pan_index=1, dtype=None):
+    """
+    Fusiona por teselas un raster multiespectral remuestreado con una pancromática, sin cargar la escena completa.
+
+    Cada tesela se lee con un halo igual al soporte de la transformada (twa_halo), se fusiona con
+    fusion_twa_multiband y solo su interior se escribe en el GeoTIFF de salida, de modo que el
+    resultado es idéntico al de fusion_twa_multiband sobre la imagen completa y la memoria
+    depende del tamaño de tesela.
+
+    Parameters:
+    - spectral_src: DatasetReader (o WarpedVRT de resampling_spectral_vrt) de la imagen
+      multiespectral a la resolución de la pancromática.
+    - pan_src: DatasetReader de la pancromática, o arreglo 2D.
+    - dst_path: Ruta del GeoTIFF de salida.
+    - levels: Número de niveles de resolución para la transformada.
+    - tile_size: Lado de las teselas sin contar el halo (por defecto 1024).
+    - backend: Motor de convolución usado por twa (por defecto 'separable').
+    - indexes: Bandas multiespectrales a fusionar (por defecto todas).
+    - pan_index: Banda de la pancromática cuando pan_src es un DatasetReader (por defecto 1).
+    - dtype: Tipo de dato de la salida (por defecto el de spectral_src).
+
+    Returns:
+    - dst_path: Ruta del GeoTIFF escrito.
+    """
+    if isinstance(spectral_src, np.ndarray):
+        raise ValueError("spectral_src debe ser un DatasetReader para obtener los metadatos de salida")
+    if indexes is None:
+        indexes = list(range(1, spectral_src.count + 1))
+    pan_indexes = None if isinstance(pan_src, np.ndarray) else pan_index
+    profile = spectral_src.profile
+    # A WarpedVRT reports the VRT driver, the output is always a GeoTIFF
+    profile.update(driver='GTiff', count=len(indexes))
+    if dtype is not None:
+        profile.update(dtype=dtype)
+    halo = twa_halo(levels)
+    with rasterio.open(dst_path, 'w', **profile) as dst:
+        for read_win, write_win, inner in iter_tiles(spectral_src.height, spectral_src.width, tile_size, halo):
+            xs = np.transpose(read_window(spectral_src, read_win, indexes), (1, 2, 0))
+            pan = read_window(pan_src, read_win, pan_indexes)
+            fused = fusion_twa_multiband(xs, pan, levels, backend=backend)
+            tile = np.transpose(fused[inner], (2, 0, 1))
+            if np.issubdtype(np.dtype(profile['dtype']), np.integer):
+                # Clip instead of wrapping values outside the range of the output type
+                tile = saturate_cast(tile, profile['dtype'])
+            dst.write(tile.astype(profile['dtype'], copy=False), window=write_win)
+    return dst_path
@@ -0,0 +1,49 @@
+import numpy as np
+
+def saturate_cast(arr:np.ndarray, dtype, out:np.ndarray = None) -> np.ndarray:
+    """
+    Convierte una imagen a un tipo entero recortando los valores fuera de rango en lugar de desbordarlos.
+
+    El recorte se escribe directamente en la salida, sin una copia intermedia de punto flotante.
+    Los tipos de punto flotante no necesitan recorte y se convierten directamente.
+
+    Parameters:
+    - arr: Imagen de entrada.
+    - dtype: Tipo de dato de salida (p. ej. 'uint8', 'uint16' o 'float32').
+    - out: Arreglo de salida opcional de tipo dtype y con la forma de arr.
+
+    Returns:
+    - out: Imagen convertida.
+    """
+    if out is None:
+        out = np.empty(arr.shape, dtype=dtype)
+    if not np.issubdtype(np.dtype(dtype), np.integer):
+        out[...] = arr
+        return out
+    limits = np.iinfo(dtype)
+    return np.clip(arr, limits.min, limits.max, out=out, casting='unsafe')
+
+def merge_bands_saturated(image:np.ndarray, list_new_bands:list[np.ndarray], dtype='uint8', chunk_rows:int = 1024) -> np.ndarray:
+    """
+    Une la imagen fusionada con nuevas bandas en un búfer (bandas, filas, columnas) del tipo de salida.
+
+    Reemplaza a astype + merge_bands: cada bloque de filas se recorta y convierte directamente
+    en un búfer preasignado con la disposición de rasterio, sin desbordamientos ni copias
+    intermedias, listo para dst.write(buffer).
+
+    Parameters:
+    - image: Imagen fusionada (filas, columnas, bandas).
+    - list_new_bands: Lista de bandas adicionales (filas, columnas).
+    - dtype: Tipo de dato de salida; los enteros se saturan (por defecto 'uint8').
+    - chunk_rows: Número de filas procesadas por bloque (por defecto 1024).
+
+    Returns:
+    - buffer: Imagen (bandas, filas, columnas).
+    """
+    bands = [image[:,:,ix] for ix in range(image.shape[2])] + list(list_new_bands)
+    buffer = np.empty((len(bands), image.shape[0], image.shape[1]), dtype=dtype)
+    for row in range(0, image.shape[0], chunk_rows):
+        rows = slice(row, row + chunk_rows)
+        for ix, band in enumerate(bands):
+            saturate_cast(band[rows], dtype, out=buffer[ix, rows])
+    return buffer
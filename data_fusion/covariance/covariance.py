@@ -0,0 +1,140 @@
+import numpy as np
+
+class CovarianceAccumulator:
+    """
+    Acumulador de medias y covarianza en una sola pasada (algoritmo de Chan/Welford).
+
+    Cada lote de muestras se resume con su media y su matriz de desviaciones cruzadas y se
+    combina con lo acumulado sin guardar las muestras, de forma numéricamente estable. Dos
+    acumuladores calculados por separado (p. ej. en distintos procesos o teselas) se combinan
+    con merge.
+    """
+
+    def __init__(self, n_vars):
+        self.count = 0
+        self.mean = np.zeros(n_vars)
+        self.m2 = np.zeros((n_vars, n_vars))
+
+    def _combine(self, count, mean, m2):
+        total = self.count + count
+        if count == 0:
+            return self
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + np.outer(delta, delta) * (self.count * count / total)
+        self.count = total
+        return self
+
+    def update(self, samples):
+        """
+        Agrega un lote de muestras.
+
+        Parameters:
+        - samples: Arreglo (variables, muestras).
+
+        Returns:
+        - self
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        count = samples.shape[1]
+        if count == 0:
+            return self
+        mean = samples.mean(axis=1)
+        centered = samples - mean[:, np.newaxis]
+        return self._combine(count, mean, centered @ centered.T)
+
+    def merge(self, other):
+        """
+        Combina otro acumulador con este.
+
+        Parameters:
+        - other: CovarianceAccumulator con el mismo número de variables.
+
+        Returns:
+        - self
+        """
+        return self._combine(other.count, other.mean, other.m2)
+
+    def covariance(self, ddof=1):
+        """
+        Obtiene la matriz de covarianza de las muestras acumuladas.
+
+        Parameters:
+        - ddof: Grados de libertad restados al número de muestras (por defecto 1, como np.cov).
+
+        Returns:
+        - Matriz de covarianza (variables x variables).
+        """
+        return self.m2 / (self.count - ddof)
+
+class VarianceAccumulator:
+    """
+    Acumulador de medias y varianzas en una sola pasada, sin covarianzas cruzadas.
+
+    Combina los lotes como CovarianceAccumulator pero solo guarda la suma de cuadrados de
+    cada variable. Las muestras de punto flotante se centran en su propio tipo (p. ej. float32)
+    y solo las sumas se acumulan en float64, así no se crea una copia float64 de cada lote.
+    """
+
+    def __init__(self, n_vars):
+        self.count = 0
+        self.mean = np.zeros(n_vars)
+        self.m2 = np.zeros(n_vars)
+
+    def _combine(self, count, mean, m2):
+        total = self.count + count
+        if count == 0:
+            return self
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + delta**2 * (self.count * count / total)
+        self.count = total
+        return self
+
+    def update(self, samples):
+        """
+        Agrega un lote de muestras.
+
+        Parameters:
+        - samples: Arreglo (variables, muestras).
+
+        Returns:
+        - self
+        """
+        samples = np.asarray(samples)
+        if not np.issubdtype(samples.dtype, np.floating):
+            samples = samples.astype(np.float64)
+        count = samples.shape[1]
+        if count == 0:
+            return self
+        # Center on the mean rounded to the sample dtype and correct the sums for the rounding
+        shift = samples.mean(axis=1, dtype=np.float64).astype(samples.dtype)
+        centered = samples - shift[:, np.newaxis]
+        sums = np.add.reduce(centered, axis=1, dtype=np.float64)
+        np.square(centered, out=centered)
+        squares = np.add.reduce(centered, axis=1, dtype=np.float64)
+        return self._combine(count, shift + sums / count, squares - sums**2 / count)
+
+    def merge(self, other):
+        """
+        Combina otro acumulador con este.
+
+        Parameters:
+        - other: VarianceAccumulator con el mismo número de variables.
+
+        Returns:
+        - self
+        """
+        return self._combine(other.count, other.mean, other.m2)
+
+    def variance(self, ddof=1):
+        """
+        Obtiene la varianza de cada variable de las muestras acumuladas.
+
+        Parameters:
+        - ddof: Grados de libertad restados al número de muestras (por defecto 1, como np.var con ddof=1).
+
+        Returns:
+        - Vector de varianzas (variables).
+        """
+        return self.m2 / (self.count - ddof)
@@ -0,0 +1,161 @@
+import numpy as np
+from data_fusion.tiling.tiling import iter_tiles, read_window, run_tiled
+from data_fusion.covariance.covariance import CovarianceAccumulator
+
+# Métodos de sustitución de componentes (CS). Todos inyectan el detalle de la pancromática
+# como fused_k = ms_k + g_k * (pan' - I), donde I es la componente sustituida, pan' es la
+# pancromática ajustada a la media y desviación de I y g_k son las ganancias de inyección.
+# Los parámetros globales se calculan una vez a partir de band_statistics y cada núcleo
+# trabaja sobre una tesela (bandas, filas, columnas), por eso todos usan el mismo ejecutor.
+
+def band_statistics(ms, pan, tile_size=1024, ms_indexes=None, pan_index=1, subsample=1):
+    """
+    Calcula en una sola pasada por teselas las medias y la covarianza de las bandas y la pancromática.
+
+    Las teselas se combinan con CovarianceAccumulator, así no se construye ninguna copia
+    reorganizada de la imagen completa.
+
+    Parameters:
+    - ms: DatasetReader o arreglo (bandas, filas, columnas) multiespectral.
+    - pan: DatasetReader o arreglo 2D de la pancromática.
+    - tile_size: Lado de las teselas (por defecto 1024).
+    - ms_indexes: Bandas multiespectrales a leer (por defecto todas).
+    - pan_index: Banda de la pancromática cuando pan es un DatasetReader (por defecto 1).
+    - subsample: Paso de muestreo en filas y columnas; con 4 se usa uno de cada 16 píxeles (por defecto 1).
+
+    Returns:
+    - Diccionario con 'mean' (bandas + 1) y 'cov' ((bandas + 1) x (bandas + 1)); la última
+      variable es la pancromática.
+    """
+    height, width = pan.shape[-2:]
+    pan_indexes = None if isinstance(pan, np.ndarray) else pan_index
+    accumulator = None
+    for window, _, _ in iter_tiles(height, width, tile_size):
+        ms_tile = read_window(ms, window, ms_indexes)[:, ::subsample, ::subsample]
+        pan_tile = read_window(pan, window, pan_indexes)[::subsample, ::subsample]
+        samples = np.concatenate((ms_tile.reshape(ms_tile.shape[0], -1), pan_tile.reshape(1, -1)))
+        if accumulator is None:
+            accumulator = CovarianceAccumulator(samples.shape[0])
+        accumulator.update(samples)
+    return {'mean': accumulator.mean, 'cov': accumulator.covariance()}
+
+def _pan_matching(stats, weights):
+    """
+    Obtiene la ganancia y el desplazamiento que ajustan la pancromática a la media y desviación de I = weights·ms.
+    """
+    cov_ms = stats['cov'][:-1, :-1]
+    mean_i = weights @ stats['mean'][:-1]
+    std_i = np.sqrt(weights @ cov_ms @ weights)
+    std_pan = np.sqrt(stats['cov'][-1, -1])
+    gain = std_i / std_pan
+    return gain, mean_i - gain * stats['mean'][-1]
+
+def _gihs_parameters(stats):
+    """
+    Parámetros de IHS generalizada: I es la media de las bandas y todas las ganancias valen 1.
+    """
+    n_band = len(stats['mean']) - 1
+    weights = np.full(n_band, 1 / n_band)
+    pan_gain, pan_offset = _pan_matching(stats, weights)
+    return {'weights': weights, 'offset': 0.0, 'gains': np.ones(n_band), 'pan_gain': pan_gain, 'pan_offset': pan_offset}
+
+def _gs_parameters(stats):
+    """
+    Parámetros de Gram-Schmidt: I es la media de las bandas y g_k = cov(ms_k, I) / var(I).
+    """
+    params = _gihs_parameters(stats)
+    cov_ms = stats['cov'][:-1, :-1]
+    weights = params['weights']
+    # Injection gains of Gram-Schmidt: cov(ms_k, I) / var(I)
+    params['gains'] = cov_ms @ weights / (weights @ cov_ms @ weights)
+    return params
+
+def _pca_parameters(stats):
+    """
+    Parámetros de PCA: vectores propios de la covarianza multiespectral (de mayor a menor
+    varianza) y ajuste de la pancromática a la media y desviación de la primera componente.
+    """
+    cov_ms = stats['cov'][:-1, :-1]
+    mean_ms = stats['mean'][:-1]
+    _, vectors = np.linalg.eigh(cov_ms)
+    vectors = vectors[:, ::-1]
+    # First principal component, oriented so that it correlates positively with the bands
+    vectors[:, 0] *= np.sign(vectors[:, 0].sum())
+    pan_gain, pan_offset = _pan_matching(stats, vectors[:, 0])
+    return {'vectors': vectors, 'mean': mean_ms,
+            'pan_gain': pan_gain, 'pan_offset': pan_offset - vectors[:, 0] @ mean_ms}
+
+def _pca_kernel(ms_tile, pan_tile, params, dtype=np.float64):
+    """
+    Núcleo por tesela de PCA: proyecta las bandas centradas, sustituye la primera componente
+    por la pancromática ajustada y vuelve a proyectar al espacio de las bandas.
+    """
+    vectors = params['vectors'].astype(dtype)
+    mean = params['mean'].astype(dtype)[:, np.newaxis, np.newaxis]
+    components = np.tensordot(vectors.T, ms_tile.astype(dtype) - mean, axes=1)
+    components[0] = pan_tile.astype(dtype) * dtype(params['pan_gain']) + dtype(params['pan_offset'])
+    return np.tensordot(vectors, components, axes=1) + mean
+
+def _substitution_kernel(ms_tile, pan_tile, params, dtype=np.float64):
+    """
+    Núcleo por tesela de los métodos CS aditivos: fused_k = ms_k + g_k * (pan' - I).
+    """
+    ms_tile = ms_tile.astype(dtype)
+    intensity = np.tensordot(params['weights'].astype(dtype), ms_tile, axes=1) + dtype(params['offset'])
+    detail = pan_tile.astype(dtype) * dtype(params['pan_gain']) + dtype(params['pan_offset']) - intensity
+    return ms_tile + params['gains'].astype(dtype)[:, np.newaxis, np.newaxis] * detail
+
+def _brovey_kernel(ms_tile, pan_tile, params, dtype=np.float64):
+    """
+    Núcleo por tesela de Brovey: fused_k = ms_k * pan' / I, equivalente a una ganancia ms_k / I por píxel.
+    """
+    ms_tile = ms_tile.astype(dtype)
+    intensity = np.tensordot(params['weights'].astype(dtype), ms_tile, axes=1)
+    pan_matched = pan_tile.astype(dtype) * dtype(params['pan_gain']) + dtype(params['pan_offset'])
+    ratio = np.divide(pan_matched, intensity, out=np.ones_like(intensity), where=intensity != 0)
+    return ms_tile * ratio
+
+# Métodos CS disponibles: (parámetros globales a partir de las estadísticas, núcleo por tesela)
+cs_methods = {
+    'gihs': (_gihs_parameters, _substitution_kernel),
+    'brovey': (_gihs_parameters, _brovey_kernel),
+    'pca': (_pca_parameters, _pca_kernel),
+    'gs': (_gs_parameters, _substitution_kernel),
+}
+
+def fusion_cs(method, ms, pan, out=None, tile_size=1024, ms_indexes=None, pan_index=1, dtype=np.float64,
+              statistics=None, subsample=1):
+    """
+    Fusiona con un método de sustitución de componentes usando el ejecutor por teselas.
+
+    Primero se recorren las teselas para obtener las estadísticas globales (band_statistics)
+    y después se aplica el núcleo del método tesela por tesela.
+
+    Parameters:
+    - method: Nombre del método en cs_methods ('gihs', 'brovey', 'pca' o 'gs').
+    - ms: DatasetReader o arreglo (bandas, filas, columnas) multiespectral a la resolución de la pancromática.
+    - pan: DatasetReader o arreglo 2D de la pancromática.
+    - out: DatasetWriter de rasterio o arreglo (bandas, filas, columnas) de salida; si es None
+      se crea un arreglo de tipo dtype.
+    - tile_size: Lado de las teselas (por defecto 1024).
+    - ms_indexes: Bandas multiespectrales a leer (por defecto todas).
+    - pan_index: Banda de la pancromática cuando pan es un DatasetReader (por defecto 1).
+    - dtype: Tipo de dato de punto flotante del cálculo (por defecto np.float64).
+    - statistics: Estadísticas precalculadas con band_statistics (opcional).
+    - subsample: Paso de muestreo usado al calcular las estadísticas (por defecto 1).
+
+    Returns:
+    - out: Imagen fusionada (bandas, filas, columnas).
+    """
+    if method not in cs_methods:
+        raise ValueError(f"Método CS desconocido: {method}")
+    parameters, kernel = cs_methods[method]
+    if statistics is None:
+        statistics = band_statistics(ms, pan, tile_size, ms_indexes, pan_index, subsample)
+    params = parameters(statistics)
+    if out is None:
+        n_band = len(statistics['mean']) - 1
+        out = np.empty((n_band, *pan.shape[-2:]), dtype=dtype)
+    dtype = np.dtype(dtype).type
+    return run_tiled(lambda ms_tile, pan_tile: kernel(ms_tile, pan_tile, params, dtype),
+                     ms, pan, out, tile_size, 0, ms_indexes, pan_index)
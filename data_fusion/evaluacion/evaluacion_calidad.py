@@ -2,11 +2,16 @@ import math
 from sewar.full_ref import uqi, ergas, sam
 from sewar.no_ref import d_lambda, d_s
 import numpy as np
+from data_fusion.covariance.covariance import VarianceAccumulator
+from data_fusion.tiling.tiling import iter_tiles, read_window
 
 def test_full_references(original_imagen,proccesed_imagen):
     """
     Calcula índices de calidad full references.
 
+    Los índices son globales sobre las imágenes recibidas; con escenas grandes se calculan sobre
+    vistas reducidas (preview_image) y solo aproximan los de la resolución completa.
+
     Args:
         original_imagen (array): La imagen original de referencia.
         proccesed_imagen (array): La imagen procesada que se compara con la imagen original.
@@ -22,6 +27,9 @@ def test_no_references(spectral_imagen,pancromatica,proccesed_imagen):
     """
     Calcula índices de calidad no references.
 
+    Al igual que test_full_references, con escenas grandes se calculan sobre vistas reducidas
+    y solo aproximan los de la resolución completa.
+
     Args:
         spectral_imagen (array): La imagen multiespectral de referencia.
         pancromatica (array): La imagen pancromática utilizada en el proceso.
@@ -36,102 +44,190 @@ def test_no_references(spectral_imagen,pancromatica,proccesed_imagen):
 # Código adaptado de PyOSIF: Optical Satellite Imagery Fusion Based on Multiresolution Approaches
 # Repositorio: https://github.com/JiahaoJZ/PyOSIF-Optical-satellite-imagery-fusion-based-on-multirresolution-approaches
 
-def spectral_ERGAS(img_origND, img_fusND, ratio, coef_rad, n_band):
+def _accumulate_differences(accumulator, reference, fused, n_band, dtype=np.float64, chunk_rows=256):
     """
-    Calcula el índice ERGAS para imágenes espectrales.
+    Agrega al acumulador, por bloques de filas, las muestras [referencia por banda, referencia - fusionada por banda].
+
+    Solo se convierte a punto flotante un bloque de filas a la vez, así las entradas pueden ser
+    uint8 sin crear copias del tamaño de la imagen.
 
     Args:
-        img_origND (array): Imagen original antes de la conversión a radiancia (3D array).
-        img_fusND (array): Imagen fusionada antes de la conversión a radiancia (3D array).
-        ratio (float): Ratio de escala espectral.
-        coef_rad (array): Coeficientes de radiación para cada banda.
+        accumulator (VarianceAccumulator): Acumulador de n_ref + n_band variables.
+        reference (array): Imagen de referencia 3D (filas, columnas, bandas) o 2D común a todas las bandas.
+        fused (array): Imagen fusionada (filas, columnas, bandas).
         n_band (int): Número de bandas espectrales.
+        dtype (type): Tipo de dato de punto flotante de los bloques; el acumulador no los convierte a
+            float64 (por defecto np.float64).
+        chunk_rows (int): Número de filas por bloque (por defecto 256).
 
     Returns:
-        float: Valor del índice ERGAS.
+        VarianceAccumulator: El acumulador actualizado.
     """
-    # Initialize variables
-    img_orig = np.empty(img_origND.shape)
-    img_fus = np.empty(img_fusND.shape)
-    dif_imgs = np.empty(img_fusND.shape)
-    mean_img_orig = np.empty(n_band)
-    mean_img_fus = np.empty(n_band)
-    std_imgs = np.empty(n_band)
-    rmse_img_fus = np.empty(n_band)
-    razon_img_fus = np.empty(n_band)
+    n_ref = n_band if reference.ndim == 3 else 1
+    rows, cols = fused.shape[:2]
+    samples = np.empty((n_ref + n_band, min(chunk_rows, rows) * cols), dtype=dtype)
+    for row in range(0, rows, chunk_rows):
+        ref_rows = reference[row:row + chunk_rows]
+        fus_rows = fused[row:row + chunk_rows]
+        count = ref_rows.shape[0] * cols
+        block = samples[:, :count].reshape(n_ref + n_band, ref_rows.shape[0], cols)
+        for i in range(n_ref):
+            block[i] = ref_rows[:,:,i] if reference.ndim == 3 else ref_rows
+        for i in range(n_band):
+            np.subtract(block[i if reference.ndim == 3 else 0], fus_rows[:,:,i], out=block[n_ref + i])
+        accumulator.update(samples[:, :count])
+    return accumulator
+
+def _difference_moments(reference, fused, n_band, dtype=np.float64, chunk_rows=256):
+    """
+    Calcula en una sola pasada la media de la referencia y la media y la varianza de la
+    diferencia referencia - fusionada de cada banda (ver _accumulate_differences).
 
-    for i in range(n_band):
-        # Digital image to radiance
-        img_orig[:,:,i] = img_origND[:,:,i]*coef_rad[i]
-        img_fus[:,:,i] = img_fusND[:,:,i]*coef_rad[i]
+    Returns:
+        tuple: Medias de la referencia, medias de la diferencia y varianzas de la diferencia por banda.
+    """
+    n_ref = n_band if reference.ndim == 3 else 1
+    accumulator = VarianceAccumulator(n_ref + n_band)
+    return _moments(_accumulate_differences(accumulator, reference, fused, n_band, dtype, chunk_rows), n_ref)
 
-        # Mean value of the radiances per band
-        mean_img_orig[i] = img_orig[:,:,i].mean()
-        mean_img_fus[i] = img_fus[:,:,i].mean()
+def _moments(accumulator, n_ref):
+    """
+    Separa las medias de la referencia y las medias y varianzas de la diferencia de un acumulador.
+    """
+    variances = accumulator.variance(ddof=0)
+    return accumulator.mean[:n_ref], accumulator.mean[n_ref:], variances[n_ref:]
 
-        # Diference between the multispectral image and the fused image
-        dif_imgs[:,:,i] = img_orig[:,:,i] - img_fus[:,:,i]
-        std_imgs[i] = np.std(dif_imgs[:,:,i])
+def _spectral_ergas(moments, ratio, coef_rad, n_band):
+    """
+    Obtiene el ERGAS espectral a partir de los momentos de _difference_moments.
+    """
+    mean_orig, mean_dif, var_dif = moments
+    coef_rad = np.asarray(coef_rad[:n_band], dtype=np.float64)
+    # Mean radiance of the original bands and RMSE between original and fused radiances
+    mean_img_orig = coef_rad * mean_orig
+    rmse_img_fus = coef_rad**2 * (mean_dif**2 + var_dif)
+    razon_img_fus = rmse_img_fus / mean_img_orig**2
 
-        # RMSE of the band
-        rmse_img_fus[i] = (mean_img_orig[i] - mean_img_fus[i])**2 + std_imgs[i]**2
+    # Spectral ergas
+    return 100*(ratio**2)*math.sqrt(razon_img_fus.mean())
 
-        # Image ratio
-        razon_img_fus[i] = rmse_img_fus[i]/(mean_img_orig[i]**2)
+def _spatial_ergas(moments, ratio, coef_rad, n_band):
+    """
+    Obtiene el ERGAS espacial a partir de los momentos de _difference_moments.
+    """
+    mean_pan, mean_dif, var_dif = moments
+    coef_rad = np.asarray(coef_rad[:n_band], dtype=np.float64)
+    # Mean radiance of the fused bands, which is also the mean of the shifted panchromatic image
+    mean_img_multi = coef_rad * (mean_pan - mean_dif)
+    rmse_img_fus = coef_rad**2 * var_dif
+    razon_img_fus = rmse_img_fus / mean_img_multi**2
 
-    # Spectral ergas
+    # Spatial ERGAS
     return 100*(ratio**2)*math.sqrt(razon_img_fus.mean())
 
-def spatial_ERGAS(img_panND, img_fusND, ratio, coef_rad, n_band):
+def spectral_ERGAS(img_origND, img_fusND, ratio, coef_rad, n_band, dtype=np.float64):
+    """
+    Calcula el índice ERGAS para imágenes espectrales.
+
+    Las medias y la varianza de la diferencia se obtienen en una sola pasada por bloques
+    (_difference_moments); con radiancia c*ND, el RMSE de cada banda es
+    c^2 * (media(dif)^2 + var(dif)).
+
+    Args:
+        img_origND (array): Imagen original antes de la conversión a radiancia (3D array).
+        img_fusND (array): Imagen fusionada antes de la conversión a radiancia (3D array).
+        ratio (float): Ratio de escala espectral.
+        coef_rad (array): Coeficientes de radiación para cada banda.
+        n_band (int): Número de bandas espectrales.
+        dtype (type): Tipo de dato de punto flotante de los bloques intermedios (por defecto np.float64).
+
+    Returns:
+        float: Valor del índice ERGAS.
+    """
+    return _spectral_ergas(_difference_moments(img_origND, img_fusND, n_band, dtype), ratio, coef_rad, n_band)
+
+def spatial_ERGAS(img_panND, img_fusND, ratio, coef_rad, n_band, dtype=np.float64):
     """
     Calcula el índice ERGAS para imágenes espaciales.
 
+    La pancromática se desplaza a la media de cada banda fusionada, así la diferencia de medias
+    es nula y el RMSE de cada banda es c^2 * var(pan - fusionada); las medias y varianzas se
+    obtienen en una sola pasada por bloques (_difference_moments).
+
     Args:
         img_panND (array): Imagen pancromática antes de la conversión a radiancia (2D array).
         img_fusND (array): Imagen fusionada antes de la conversión a radiancia (3D array).
         ratio (float): Ratio de escala espacial.
         coef_rad (array): Coeficientes de radiación para cada banda.
         n_band (int): Número de bandas espectrales.
+        dtype (type): Tipo de dato de punto flotante de los bloques intermedios (por defecto np.float64).
 
     Returns:
         float: Valor del índice ERGAS.
     """
-    # Initialize variables
-    img_panc = np.empty(img_fusND.shape)
-    img_fus = np.empty(img_fusND.shape)
-    dif_imgs = np.empty(img_fusND.shape)
-    img_pan_hist = np.empty(img_fusND.shape)
-    mean_img_pan = np.empty(n_band)
-    mean_img_multi = np.empty(n_band) # multi is the fused img
-    rmse_img_fus = np.empty(n_band)
-    razon_img_fus = np.empty(n_band)
-    std_imgs = np.empty(n_band)
-
-    for i in range(n_band):
-        # Digital image to radiance
-        img_panc[:,:,i] = img_panND*coef_rad[i]
-        img_fus[:,:,i] = img_fusND[:,:,i]*coef_rad[i]
+    return _spatial_ergas(_difference_moments(img_panND, img_fusND, n_band, dtype), ratio, coef_rad, n_band)
 
-        # Mean value of the radiances per band
-        mean_img_pan[i] = img_panc[:,:,i].mean()
-        mean_img_multi[i] = img_fus[:,:,i].mean()
+def windowed_ERGAS(spectral_src, pan_src, fused_src, ratio, coef_rad, n_band, tile_size=1024,
+                   spectral_indexes=None, fused_indexes=None, pan_index=1, dtype=np.float64):
+    """
+    Calcula el ERGAS espectral y el espacial leyendo las imágenes por ventanas, sin cargarlas completas.
 
-        # Histogram of the panchromatic image
-        delta_media = mean_img_multi[i] - mean_img_pan[i]
-        img_pan_hist[:,:,i] = img_panc[:,:,i] + delta_media
+    Los momentos de cada ventana se acumulan en los mismos acumuladores que spectral_ERGAS y
+    spatial_ERGAS, así el resultado es el mismo que con las imágenes completas.
 
-        # Mean value of the panchromatic image histogram
-        mean_img_pan[i] = img_pan_hist[:,:,i].mean()
+    Args:
+        spectral_src: DatasetReader (o WarpedVRT) o arreglo (bandas, filas, columnas) multiespectral de referencia.
+        pan_src: DatasetReader, PancromaticaSource o arreglo 2D de la pancromática.
+        fused_src: DatasetReader o arreglo (bandas, filas, columnas) de la imagen fusionada.
+        ratio (float): Ratio de escala.
+        coef_rad (array): Coeficientes de radiación para cada banda.
+        n_band (int): Número de bandas espectrales.
+        tile_size (int): Lado de las ventanas (por defecto 1024).
+        spectral_indexes (list): Bandas multiespectrales a leer (por defecto todas).
+        fused_indexes (list): Bandas fusionadas a leer (por defecto todas).
+        pan_index (int): Banda de la pancromática cuando pan_src no es un arreglo (por defecto 1).
+        dtype (type): Tipo de dato de punto flotante de los bloques intermedios (por defecto np.float64).
 
-        # Diference between the panchromatic image and the fused image
-        dif_imgs[:,:,i] = img_pan_hist[:,:,i] - img_fus[:,:,i]
-        std_imgs[i] = np.std(dif_imgs[:,:,i])
+    Returns:
+        tuple: (ERGAS espectral, ERGAS espacial).
+    """
+    pan_indexes = None if isinstance(pan_src, np.ndarray) else pan_index
+    spectral_acc = VarianceAccumulator(2 * n_band)
+    spatial_acc = VarianceAccumulator(1 + n_band)
+    height, width = pan_src.shape[-2:]
+    for window, _, _ in iter_tiles(height, width, tile_size):
+        fused = np.moveaxis(read_window(fused_src, window, fused_indexes), 0, 2)
+        spectral = np.moveaxis(read_window(spectral_src, window, spectral_indexes), 0, 2)
+        _accumulate_differences(spectral_acc, spectral, fused, n_band, dtype)
+        _accumulate_differences(spatial_acc, read_window(pan_src, window, pan_indexes), fused, n_band, dtype)
+    return (_spectral_ergas(_moments(spectral_acc, n_band), ratio, coef_rad, n_band),
+            _spatial_ergas(_moments(spatial_acc, 1), ratio, coef_rad, n_band))
+
+def windowed_spectral_ERGAS(reference_src, fused_src, ratio, coef_rad, n_band, tile_size=1024,
+                            reference_indexes=None, fused_indexes=None, dtype=np.float64):
+    """
+    Calcula el ERGAS espectral entre una referencia y la imagen fusionada leyendo ambas por ventanas.
 
-        # RMSE of the band
-        rmse_img_fus[i] = (mean_img_pan[i] - mean_img_multi[i])**2 + std_imgs[i]**2
+    Con ratio 1/2 coincide con el índice ERGAS de sewar (r=1/4) sobre las imágenes completas.
 
-        # Image ratio
-        razon_img_fus[i] = rmse_img_fus[i]/(mean_img_pan[i]**2)
+    Args:
+        reference_src: DatasetReader (o WarpedVRT) o arreglo (bandas, filas, columnas) de referencia.
+        fused_src: DatasetReader o arreglo (bandas, filas, columnas) de la imagen fusionada.
+        ratio (float): Ratio de escala.
+        coef_rad (array): Coeficientes de radiación para cada banda.
+        n_band (int): Número de bandas espectrales.
+        tile_size (int): Lado de las ventanas (por defecto 1024).
+        reference_indexes (list): Bandas de referencia a leer (por defecto todas).
+        fused_indexes (list): Bandas fusionadas a leer (por defecto todas).
+        dtype (type): Tipo de dato de punto flotante de los bloques intermedios (por defecto np.float64).
 
-    # Spatial ERGAS
-    return 100*(ratio**2)*math.sqrt(razon_img_fus.mean())
\ No newline at end of file
+    Returns:
+        float: Valor del índice ERGAS.
+    """
+    accumulator = VarianceAccumulator(2 * n_band)
+    height, width = fused_src.shape[-2:]
+    for window, _, _ in iter_tiles(height, width, tile_size):
+        reference = np.moveaxis(read_window(reference_src, window, reference_indexes), 0, 2)
+        fused = np.moveaxis(read_window(fused_src, window, fused_indexes), 0, 2)
+        _accumulate_differences(accumulator, reference, fused, n_band, dtype)
+    return _spectral_ergas(_moments(accumulator, n_band), ratio, coef_rad, n_band)
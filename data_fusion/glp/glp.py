@@ -0,0 +1,130 @@
+import math
+import cv2
+import numpy as np
+
+# Pirámide Laplaciana Generalizada (GLP) con filtros gaussianos ajustados a la MTF del sensor.
+# A diferencia de la transformada à trous, cada nivel se diezma por 2, así que la pirámide
+# completa ocupa y cuesta alrededor de 1 + 1/4 + 1/16 + ... ≈ 1.33 veces una imagen completa.
+
+# Núcleo de interpolación para ampliar por 2 (B3-spline; suma 2 para compensar los ceros insertados)
+expand_taps = np.array([1, 4, 6, 4, 1], dtype=np.float64) / 8
+
+def mtf_gaussian_taps(ratio=2, gain=0.3, dtype=np.float64):
+    """
+    Obtiene el filtro gaussiano 1D cuya respuesta en la frecuencia de Nyquist de la imagen
+    diezmada (1 / (2 * ratio)) es igual a la ganancia de la MTF del sensor.
+
+    De exp(-2 * pi^2 * sigma^2 * f^2) = gain en f = 1 / (2 * ratio) se obtiene
+    sigma = ratio * sqrt(-2 * ln(gain)) / pi.
+
+    Parameters:
+    - ratio: Factor de diezmado (por defecto 2).
+    - gain: Ganancia de la MTF en la frecuencia de Nyquist (por defecto 0.3).
+    - dtype: Tipo de dato de punto flotante del filtro (por defecto np.float64).
+
+    Returns:
+    - taps: Filtro normalizado de 2 * ceil(3 * sigma) + 1 tomas.
+    """
+    if not 0 < gain < 1:
+        raise ValueError(f"La ganancia de la MTF debe estar entre 0 y 1, se recibió: {gain}")
+    sigma = ratio * math.sqrt(-2 * math.log(gain)) / math.pi
+    radius = math.ceil(3 * sigma)
+    taps = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+    return (taps / taps.sum()).astype(dtype)
+
+def glp_reduce(img, taps):
+    """
+    Filtra una imagen con el filtro MTF y la diezma por 2 (se conservan filas y columnas pares).
+
+    Los bordes se reflejan (BORDER_REFLECT_101), lo que conserva la paridad de las muestras.
+    """
+    low = cv2.sepFilter2D(img, -1, taps, taps, borderType=cv2.BORDER_REFLECT_101)
+    return low[::2, ::2]
+
+def glp_expand(img, shape):
+    """
+    Amplía por 2 una imagen diezmada hasta la forma dada: inserta ceros y los interpola con expand_taps.
+    """
+    upsampled = np.zeros(shape, dtype=img.dtype)
+    upsampled[::2, ::2] = img
+    taps = expand_taps.astype(img.dtype)
+    return cv2.sepFilter2D(upsampled, -1, taps, taps, borderType=cv2.BORDER_REFLECT_101)
+
+def glp_detail(pan, levels, init_level=0, gain=0.3, dtype=np.float64):
+    """
+    Obtiene el detalle de la pancromática con la pirámide GLP: la diferencia entre la
+    aproximación del nivel init_level y la del último nivel, ambas ampliadas a la resolución completa.
+
+    Solo se guardan las aproximaciones diezmadas, de modo que la memoria adicional es
+    alrededor de 1.33 veces la imagen.
+
+    Parameters:
+    - pan: Imagen pancromática (2D).
+    - levels: Número de niveles de la pirámide; el factor de escala cubierto es 2**levels.
+    - init_level: Nivel inicial; los detalles de los niveles más finos se descartan (por defecto 0).
+    - gain: Ganancia de la MTF del sensor en la frecuencia de Nyquist (por defecto 0.3).
+    - dtype: Tipo de dato de punto flotante del cálculo (por defecto np.float64).
+
+    Returns:
+    - detail: Detalle de la pancromática a resolución completa.
+    """
+    taps = mtf_gaussian_taps(2, gain, dtype)
+    approximations = [np.asarray(pan, dtype=dtype)]
+    for level in range(levels):
+        approximations.append(glp_reduce(approximations[-1], taps))
+    # Expand the coarsest approximation up to init_level, take the detail there and expand it to full resolution
+    low = approximations[levels]
+    for level in range(levels - 1, init_level - 1, -1):
+        low = glp_expand(low, approximations[level].shape)
+    detail = approximations[init_level] - low
+    for level in range(init_level - 1, -1, -1):
+        detail = glp_expand(detail, approximations[level].shape)
+    return detail
+
+def glp_halo(levels, init_level=0, gain=0.3):
+    """
+    Obtiene el margen (en píxeles) que necesita una tesela para que su interior coincida con la imagen completa.
+
+    El margen cubre el soporte de los filtros de reducción y ampliación en todos los niveles y es
+    múltiplo de 2**levels para que el diezmado conserve la fase; las teselas deben ser también
+    múltiplo de 2**levels.
+
+    Parameters:
+    - levels: Número de niveles de la pirámide.
+    - init_level: Nivel inicial (por defecto 0).
+    - gain: Ganancia de la MTF del sensor en la frecuencia de Nyquist (por defecto 0.3).
+
+    Returns:
+    - halo: Número de píxeles de solapamiento necesarios a cada lado.
+    """
+    radius = len(mtf_gaussian_taps(2, gain)) // 2 + len(expand_taps) // 2
+    support = radius * (2 ** levels - 1)
+    step = 2 ** levels
+    return -(-support // step) * step
+
+def fusion_glp_multiband(xs, pan, levels, init_level=0, gain=0.3, dtype=np.float64):
+    """
+    Fusiona imágenes multibanda con la pirámide MTF-GLP: a cada banda se le suma el detalle de la
+    pancromática obtenido con glp_detail.
+
+    Parameters:
+    - xs: Imágenes multibanda a fusionar (tensor tridimensional).
+    - pan: Imagen pancromática utilizada para la fusión.
+    - levels: Número de niveles de la pirámide; el factor de escala cubierto es 2**levels.
+    - init_level: Nivel inicial de la pirámide (por defecto 0).
+    - gain: Ganancia de la MTF del sensor en la frecuencia de Nyquist (por defecto 0.3).
+    - dtype: Tipo de dato de punto flotante de la fusión (por defecto np.float64).
+
+    Returns:
+    - fused_image: Imagen fusionada.
+    """
+    if pan.ndim > 2:
+        pan = pan[:,:,0]
+    if xs.ndim <= 2:
+        print("The first argument must have the shape (x,y,z), received: " + str(xs.shape))
+        return None
+    detail_pan = glp_detail(pan, levels, init_level, gain, dtype)
+    fused_image = np.empty(xs.shape, dtype=dtype)
+    for nBand in range(xs.shape[2]):
+        fused_image[:,:,nBand] = xs[:,:,nBand] + detail_pan
+    return fused_image
@@ -0,0 +1,151 @@
+import numpy as np
+from data_fusion.tiling.tiling import iter_tiles, read_window
+
+def integer_histogram(arr, scale=1, minlength=0):
+    """
+    Calcula el histograma de una imagen de valores enteros (o cuantizables) con np.bincount.
+
+    Parameters:
+    - arr: Imagen de enteros no negativos, o de punto flotante cuyos valores por scale son enteros.
+    - scale: Factor por el que se multiplican los valores de punto flotante antes de redondearlos;
+      p. ej. 3 para la intensidad (R+G+B)/3 de bandas de 8 bits (por defecto 1).
+    - minlength: Longitud mínima del histograma (por defecto 0).
+
+    Returns:
+    - Conteo de píxeles por valor entero.
+    """
+    arr = np.asarray(arr)
+    if not np.issubdtype(arr.dtype, np.integer):
+        arr = np.rint(arr * scale).astype(np.int64)
+    return np.bincount(arr.ravel(), minlength=minlength)
+
+def histogram_lut(src_hist, ref_hist, reference_scale=1, dtype=np.float64):
+    """
+    Construye la tabla de consulta que iguala el histograma de origen al de referencia.
+
+    Cada valor de origen se asigna al valor de referencia con el mismo cuantil de la función de
+    distribución acumulada, igual que skimage.exposure.match_histograms.
+
+    Parameters:
+    - src_hist: Histograma de la imagen de origen (p. ej. 256 valores para 8 bits).
+    - ref_hist: Histograma de la imagen de referencia calculado con integer_histogram.
+    - reference_scale: Escala usada al calcular ref_hist (por defecto 1).
+    - dtype: Tipo de dato de la tabla (por defecto np.float64).
+
+    Returns:
+    - lut: Tabla con un valor igualado por cada valor de origen.
+    """
+    src_quantiles = np.cumsum(src_hist) / np.sum(src_hist)
+    ref_values = np.flatnonzero(ref_hist)
+    ref_quantiles = np.cumsum(ref_hist[ref_values]) / np.sum(ref_hist)
+    return np.interp(src_quantiles, ref_quantiles, ref_values / reference_scale).astype(dtype)
+
+def match_histograms_lut(source, reference, reference_scale=1, dtype=np.float64):
+    """
+    Iguala el histograma de una imagen de 8 bits al de una referencia con una tabla de consulta.
+
+    Sustituye a skimage.exposure.match_histograms para la pancromática: en lugar de ordenar
+    todos los píxeles, usa histogramas con np.bincount y una sola indexación sobre la tabla.
+
+    Parameters:
+    - source: Imagen de origen de enteros no negativos (p. ej. la pancromática uint8).
+    - reference: Imagen de referencia (p. ej. la intensidad I).
+    - reference_scale: Escala para cuantizar la referencia si es de punto flotante (ver integer_histogram).
+    - dtype: Tipo de dato del resultado (por defecto np.float64).
+
+    Returns:
+    - Imagen igualada.
+    """
+    src_hist = integer_histogram(source, minlength=np.iinfo(source.dtype).max + 1)
+    ref_hist = integer_histogram(reference, reference_scale)
+    return histogram_lut(src_hist, ref_hist, reference_scale, dtype)[source]
+
+def streaming_histogram(source, tile_size=1024, index=1, scale=1):
+    """
+    Calcula el histograma de un raster tesela por tesela, sin cargarlo completo.
+
+    Parameters:
+    - source: DatasetReader de rasterio o arreglo 2D.
+    - tile_size: Lado de las teselas (por defecto 1024).
+    - index: Banda a leer cuando source es un DatasetReader (por defecto 1).
+    - scale: Escala para cuantizar valores de punto flotante (ver integer_histogram).
+
+    Returns:
+    - Conteo de píxeles por valor entero.
+    """
+    height, width = source.shape[-2:]
+    indexes = None if isinstance(source, np.ndarray) else index
+    hist = np.zeros(0, dtype=np.int64)
+    for window, _, _ in iter_tiles(height, width, tile_size):
+        tile_hist = integer_histogram(read_window(source, window, indexes), scale)
+        if len(tile_hist) > len(hist):
+            tile_hist[:len(hist)] += hist
+            hist = tile_hist
+        else:
+            hist[:len(tile_hist)] += tile_hist
+    return hist
+
+def match_histograms_streaming(source, reference, tile_size=1024, source_index=1, reference_index=1,
+                               reference_scale=1, dtype=np.float64):
+    """
+    Construye la tabla de igualación de histogramas de dos rasters leyéndolos por teselas.
+
+    La tabla se aplica luego a cada tesela de origen con lut[tesela], de modo que la igualación
+    funciona con rasters que no caben en memoria.
+
+    Parameters:
+    - source: DatasetReader o arreglo 2D de enteros no negativos (p. ej. la pancromática uint8).
+    - reference: DatasetReader o arreglo 2D de referencia (p. ej. la intensidad I).
+    - tile_size: Lado de las teselas (por defecto 1024).
+    - source_index: Banda de origen cuando source es un DatasetReader (por defecto 1).
+    - reference_index: Banda de referencia cuando reference es un DatasetReader (por defecto 1).
+    - reference_scale: Escala para cuantizar la referencia si es de punto flotante (ver integer_histogram).
+    - dtype: Tipo de dato de la tabla (por defecto np.float64).
+
+    Returns:
+    - lut: Tabla con un valor igualado por cada valor de origen.
+    """
+    src_hist = streaming_histogram(source, tile_size, source_index)
+    ref_hist = streaming_histogram(reference, tile_size, reference_index, reference_scale)
+    return histogram_lut(src_hist, ref_hist, reference_scale, dtype)
+
+def binned_histogram(source, bins=20, tile_size=1024, index=1):
+    """
+    Calcula un histograma de bins intervalos iguales entre el mínimo y el máximo, tesela por tesela.
+
+    Da los mismos conteos que np.histogram(source, bins) (y que pyplot.hist) sin aplanar ni copiar
+    la imagen: con enteros no negativos se parte del conteo por valor de streaming_histogram y
+    con punto flotante se acumula np.histogram de cada tesela con los mismos bordes.
+
+    Parameters:
+    - source: DatasetReader de rasterio o arreglo 2D.
+    - bins: Número de intervalos (por defecto 20).
+    - tile_size: Lado de las teselas (por defecto 1024).
+    - index: Banda a leer cuando source es un DatasetReader (por defecto 1).
+
+    Returns:
+    - Tupla (conteos, bordes) como la de np.histogram.
+    """
+    height, width = source.shape[-2:]
+    indexes = None if isinstance(source, np.ndarray) else index
+    dtype = np.dtype(source.dtype if isinstance(source, np.ndarray) else source.dtypes[index - 1])
+    if np.issubdtype(dtype, np.unsignedinteger):
+        value_counts = streaming_histogram(source, tile_size, index)
+        values = np.flatnonzero(value_counts)
+        low, high = values[0], values[-1]
+    else:
+        value_counts = None
+        low, high = np.inf, -np.inf
+        for window, _, _ in iter_tiles(height, width, tile_size):
+            tile = read_window(source, window, indexes)
+            low, high = min(low, tile.min()), max(high, tile.max())
+    if low == high:
+        # Same range np.histogram uses for constant images
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, bins + 1)
+    if value_counts is not None:
+        return np.histogram(np.arange(len(value_counts)), edges, weights=value_counts)[0].astype(np.int64), edges
+    counts = np.zeros(bins, dtype=np.int64)
+    for window, _, _ in iter_tiles(height, width, tile_size):
+        counts += np.histogram(read_window(source, window, indexes), edges)[0]
+    return counts, edges
@@ -0,0 +1,120 @@
+import numpy as np
+
+# Métodos de análisis multirresolución (MRA) de costo lineal: el detalle de la pancromática se
+# obtiene con filtros de caja o guiados calculados con imágenes integrales (sumas acumuladas),
+# por lo que su costo no depende del radio del filtro.
+
+def _window_sums(arr, radius, axis, out):
+    """
+    Calcula las sumas en ventanas de 2*radius+1 muestras a lo largo de un eje, recortadas al borde.
+
+    La suma acumulada se extiende con radius ceros al inicio y radius copias del total al final,
+    de modo que cada ventana es la resta de dos rebanadas, sin índices por píxel.
+    """
+    n = arr.shape[axis]
+    take = lambda start, stop: (slice(None),) * axis + (slice(start, stop),)
+    shape = list(arr.shape)
+    shape[axis] = n + 2 * radius + 1
+    integral = np.zeros(shape, dtype=np.float64)
+    np.cumsum(arr, axis=axis, dtype=np.float64, out=integral[take(radius + 1, radius + 1 + n)])
+    integral[take(radius + 1 + n, None)] = integral[take(radius + n, radius + 1 + n)]
+    return np.subtract(integral[take(2 * radius + 1, None)], integral[take(0, n)], out=out)
+
+def box_mean(img, radius, dtype=np.float64):
+    """
+    Calcula la media en una ventana de (2*radius+1)^2 píxeles con imágenes integrales.
+
+    En los bordes se promedian solo los píxeles que caen dentro de la imagen. El costo no
+    depende del radio.
+
+    Parameters:
+    - img: Imagen de entrada (2D).
+    - radius: Radio de la ventana en píxeles.
+    - dtype: Tipo de dato de punto flotante del resultado (por defecto np.float64).
+
+    Returns:
+    - Imagen filtrada.
+    """
+    height, width = img.shape
+    # Vertical window sums, then horizontal window sums over the same buffer
+    sums = _window_sums(img, radius, 0, np.empty((height, width)))
+    sums = _window_sums(sums, radius, 1, sums)
+    rows, cols = np.arange(height), np.arange(width)
+    row_counts = np.minimum(rows + radius + 1, height) - np.maximum(rows - radius, 0)
+    col_counts = np.minimum(cols + radius + 1, width) - np.maximum(cols - radius, 0)
+    sums /= row_counts[:, np.newaxis] * col_counts[np.newaxis, :]
+    return sums.astype(dtype, copy=False)
+
+def guided_filter(guide, src, radius, eps, dtype=np.float64):
+    """
+    Aplica el filtro guiado de He et al.: suaviza src preservando los bordes de guide.
+
+    Parameters:
+    - guide: Imagen guía (2D).
+    - src: Imagen a filtrar (2D).
+    - radius: Radio de las ventanas en píxeles.
+    - eps: Regularización; valores mayores suavizan más (en unidades de intensidad al cuadrado).
+    - dtype: Tipo de dato de punto flotante del resultado (por defecto np.float64).
+
+    Returns:
+    - Imagen filtrada.
+    """
+    guide = np.asarray(guide, dtype=np.float64)
+    src = np.asarray(src, dtype=np.float64)
+    mean_guide = box_mean(guide, radius)
+    mean_src = box_mean(src, radius)
+    cov_guide_src = box_mean(guide * src, radius) - mean_guide * mean_src
+    var_guide = box_mean(guide * guide, radius) - mean_guide * mean_guide
+    a = cov_guide_src / (var_guide + eps)
+    b = mean_src - a * mean_guide
+    return (box_mean(a, radius) * guide + box_mean(b, radius)).astype(dtype, copy=False)
+
+def fusion_hpf_multiband(xs, pan, radius=2, dtype=np.float64):
+    """
+    Fusiona imágenes multibanda con filtro pasa-altos (HPF): a cada banda se le suma pan - media de caja de pan.
+
+    Parameters:
+    - xs: Imágenes multibanda a fusionar (tensor tridimensional).
+    - pan: Imagen pancromática utilizada para la fusión.
+    - radius: Radio del filtro de caja en píxeles (por defecto 2).
+    - dtype: Tipo de dato de punto flotante de la fusión (por defecto np.float64).
+
+    Returns:
+    - fused_image: Imagen fusionada.
+    """
+    if pan.ndim > 2:
+        pan = pan[:,:,0]
+    if xs.ndim <= 2:
+        print("The first argument must have the shape (x,y,z), received: " + str(xs.shape))
+        return None
+    detail_pan = np.asarray(pan, dtype=dtype) - box_mean(pan, radius, dtype)
+    fused_image = np.empty(xs.shape, dtype=dtype)
+    for nBand in range(xs.shape[2]):
+        fused_image[:,:,nBand] = xs[:,:,nBand] + detail_pan
+    return fused_image
+
+def fusion_guided_multiband(xs, pan, radius=2, eps=100.0, dtype=np.float64):
+    """
+    Fusiona imágenes multibanda con filtro guiado: la parte de baja resolución de pan se estima
+    con un filtro guiado por cada banda y el resto se inyecta en la banda.
+
+    Parameters:
+    - xs: Imágenes multibanda a fusionar (tensor tridimensional).
+    - pan: Imagen pancromática utilizada para la fusión.
+    - radius: Radio del filtro guiado en píxeles (por defecto 2).
+    - eps: Regularización del filtro guiado (por defecto 100, para intensidades de 8 bits).
+    - dtype: Tipo de dato de punto flotante de la fusión (por defecto np.float64).
+
+    Returns:
+    - fused_image: Imagen fusionada.
+    """
+    if pan.ndim > 2:
+        pan = pan[:,:,0]
+    if xs.ndim <= 2:
+        print("The first argument must have the shape (x,y,z), received: " + str(xs.shape))
+        return None
+    pan = np.asarray(pan, dtype=dtype)
+    fused_image = np.empty(xs.shape, dtype=dtype)
+    for nBand in range(xs.shape[2]):
+        fused_image[:,:,nBand] = xs[:,:,nBand] + (pan - guided_filter(xs[:,:,nBand], pan, radius, eps, dtype))
+    return fused_image
@@ -1,16 +1,97 @@
+import numpy as np
+import cv2
 from func.functions import process_imag_to_another_model 
 from math import sqrt
 
-def rgb_to_ihs(image_rgb):
+def rgb_to_ihs(image_rgb, dtype=np.float64):
     """
     Convierte una imagen RGB a espacio de color IHS.
 
     Parameters:
     - image_rgb: Imagen en formato RGB.
+    - dtype: Tipo de dato de punto flotante del resultado (por defecto np.float64).
 
     Returns:
     - ihs_image: Imagen convertida a espacio de color IHS.
     """
     mask_matrix = [[1/3,1/3,1/3], [1/sqrt(6), 1/sqrt(6),-2/sqrt(6)], [1/sqrt(2), -1/sqrt(2), 0]]
-    return process_imag_to_another_model(image_rgb,mask_matrix)
+    return process_imag_to_another_model(image_rgb,mask_matrix,dtype)
 
+
+def estimate_intensity_weights(ms, pan, factor=16):
+    """
+    Estima por mínimos cuadrados los pesos de cada banda para que la intensidad se parezca a la pancromática.
+
+    El ajuste se hace sobre copias reducidas de ambas imágenes (promedio por bloques de
+    factor x factor píxeles, calculado por bloques de filas sin convertir la imagen completa),
+    por lo que su costo es despreciable frente a la fusión.
+
+    Parameters:
+    - ms: Imagen multiespectral (filas, columnas, bandas).
+    - pan: Pancromática (filas, columnas).
+    - factor: Factor de reducción por eje del nivel de la pirámide (por defecto 16).
+
+    Returns:
+    - weights: Peso de cada banda en la intensidad.
+    """
+    factor = max(1, min(factor, ms.shape[0], ms.shape[1]))
+    rows, cols = ms.shape[0] // factor, ms.shape[1] // factor
+    small_ms = np.empty((rows, cols, ms.shape[2]), dtype=np.float64)
+    small_pan = np.empty((rows, cols), dtype=np.float64)
+    # Block means (INTER_AREA with an integer factor) over row chunks of the native data,
+    # so only one chunk at a time is converted to floating point
+    chunk = max(1, 256 // factor)
+    for row in range(0, rows, chunk):
+        block_rows = slice(row * factor, min(row + chunk, rows) * factor)
+        size = (cols, min(row + chunk, rows) - row)
+        for src, dst in ((ms, small_ms), (pan, small_pan)):
+            block = np.asarray(src[block_rows, :cols * factor], dtype=np.float32)
+            dst[row:row + chunk] = cv2.resize(block, size, interpolation=cv2.INTER_AREA).reshape(dst[row:row + chunk].shape)
+    design = small_ms.reshape(-1, ms.shape[2])
+    weights, _, _, _ = np.linalg.lstsq(design, small_pan.reshape(-1), rcond=None)
+    return weights
+
+def fusion_ihs_fast(ms, pan_i, weights=None, out_dtype=np.uint8, chunk_rows=1024, dtype=np.float64, out=None):
+    """
+    Fusiona con IHS aditivo sin calcular las transformadas directa e inversa.
+
+    Con una IHS lineal, sustituir la intensidad por la pancromática y volver a RGB equivale a
+    sumar (pan_i - I) a cada banda, donde I es la intensidad. El cálculo se hace por bloques de
+    filas en una sola pasada, admite N bandas (p. ej. NIR también se afina) y el resultado se
+    recorta al rango del tipo de salida antes de convertirlo.
+
+    Parameters:
+    - ms: Imagen multiespectral (filas, columnas, bandas).
+    - pan_i: Pancromática igualada a la intensidad (filas, columnas).
+    - weights: Pesos de cada banda en la intensidad; si es None se usa 1/3 en las tres primeras
+      bandas, como en rgb_to_ihs, y con 'adaptive' se estiman con estimate_intensity_weights
+      (en ese caso pan_i puede ser la pancromática sin igualar).
+    - out_dtype: Tipo de dato de la imagen fusionada (por defecto np.uint8).
+    - chunk_rows: Número de filas procesadas por bloque (por defecto 1024).
+    - dtype: Tipo de dato de punto flotante del cálculo (por defecto np.float64).
+    - out: Arreglo de salida opcional (filas, columnas, bandas) de tipo out_dtype.
+
+    Returns:
+    - out: Imagen fusionada.
+    """
+    n_band = ms.shape[2]
+    if weights is None:
+        weights = [1/3, 1/3, 1/3]
+    elif isinstance(weights, str) and weights == 'adaptive':
+        weights = estimate_intensity_weights(ms, pan_i)
+    # Bands without a weight (e.g. NIR) do not contribute to the intensity
+    band_weights = np.zeros(n_band, dtype=dtype)
+    band_weights[:len(weights)] = weights
+    if out is None:
+        out = np.empty(ms.shape, dtype=out_dtype)
+    limits = np.iinfo(out.dtype) if np.issubdtype(out.dtype, np.integer) else None
+    for row in range(0, ms.shape[0], chunk_rows):
+        rows = slice(row, row + chunk_rows)
+        block = ms[rows].astype(dtype)
+        # Difference between the panchromatic image and the intensity
+        delta = pan_i[rows].astype(dtype) - block @ band_weights
+        block += delta[:,:,np.newaxis]
+        if limits is not None:
+            np.clip(block, limits.min, limits.max, out=block)
+        out[rows] = block
+    return out
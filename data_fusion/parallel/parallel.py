@@ -0,0 +1,53 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+def create_shared_array(shape, dtype, data=None):
+    """
+    Crea un arreglo en memoria compartida para que los procesos trabajadores lo usen sin serializarlo.
+
+    Parameters:
+    - shape: Forma del arreglo.
+    - dtype: Tipo de dato del arreglo.
+    - data: Datos iniciales opcionales que se copian en el arreglo.
+
+    Returns:
+    - shm: Bloque SharedMemory (el llamador debe cerrarlo y liberarlo con release_shared_array).
+    - array: Arreglo de numpy respaldado por el bloque.
+    """
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    if data is not None:
+        array[...] = data
+    return shm, array
+
+def attach_shared_array(spec):
+    """
+    Abre desde un proceso trabajador un arreglo creado con create_shared_array.
+
+    Parameters:
+    - spec: Tupla (nombre, forma, tipo de dato) obtenida con shared_array_spec.
+
+    Returns:
+    - shm: Bloque SharedMemory (el trabajador debe cerrarlo, no liberarlo).
+    - array: Arreglo de numpy respaldado por el bloque.
+    """
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+# Descripción serializable de un arreglo compartido para enviarla a los trabajadores
+shared_array_spec = lambda shm, array: (shm.name, array.shape, array.dtype.str)
+
+def release_shared_array(shm):
+    """
+    Cierra y libera un bloque de memoria compartida creado con create_shared_array.
+
+    Parameters:
+    - shm: Bloque SharedMemory.
+
+    Returns:
+    - None
+    """
+    shm.close()
+    shm.unlink()
@@ -0,0 +1,230 @@
+import time
+import tracemalloc
+import numpy as np
+from data_fusion.tiling.tiling import iter_tiles, read_window, run_tiled
+from data_fusion.histogram.histogram import integer_histogram, histogram_lut
+from data_fusion.a_wavelet.a_wavelet import fusion_twa_multiband, twa_halo
+from data_fusion.ihs.ihs import fusion_ihs_fast
+from data_fusion.hpf.hpf import fusion_hpf_multiband, fusion_guided_multiband
+from data_fusion.glp.glp import fusion_glp_multiband, glp_halo
+from data_fusion.cs.cs import cs_methods, band_statistics
+
+class FusionMethod:
+    """
+    Descripción de un método de fusión para el ejecutor común por teselas.
+
+    Attributes:
+    - name: Nombre con el que se registra el método.
+    - label: Nombre para mostrar en el menú.
+    - kernel: Función kernel(ms_tile, pan_tile, stats, dtype, **params) que fusiona una tesela
+      (bandas, filas, columnas) y devuelve la tesela fusionada en punto flotante.
+    - halo: Entero o función halo(**params) con el margen que necesita el núcleo.
+    - statistics: Función statistics(ms, pan, tile_size, **params) que calcula las estadísticas
+      globales en una primera pasada, o None si el método no las requiere.
+    - dtypes: Tipos de dato de punto flotante admitidos.
+    - alignment: Entero o función alignment(**params) del que el tamaño de tesela debe ser
+      múltiplo (p. ej. 2**levels en los métodos que diezman).
+    - prefix: Prefijo del archivo de resultado (por defecto el nombre en mayúsculas).
+    """
+
+    def __init__(self, name, label, kernel, halo=0, statistics=None, dtypes=(np.float32, np.float64), alignment=1,
+                 prefix=None):
+        self.name = name
+        self.label = label
+        self.kernel = kernel
+        self.halo = halo
+        self.statistics = statistics
+        self.dtypes = tuple(np.dtype(dtype) for dtype in dtypes)
+        self.alignment = alignment
+        self.prefix = prefix if prefix is not None else name.upper()
+
+    def get_halo(self, **params):
+        """
+        Obtiene el halo del método para los parámetros dados.
+        """
+        return self.halo(**params) if callable(self.halo) else self.halo
+
+    def get_tile_size(self, tile_size, **params):
+        """
+        Redondea el tamaño de tesela hacia arriba al múltiplo de la alineación del método.
+        """
+        alignment = self.alignment(**params) if callable(self.alignment) else self.alignment
+        return -(-tile_size // alignment) * alignment
+
+# Métodos registrados, en orden de registro
+fusion_methods = {}
+
+def register_method(method):
+    """
+    Registra un método de fusión para que el ejecutor y los scripts lo encuentren por nombre.
+
+    Parameters:
+    - method: FusionMethod a registrar.
+
+    Returns:
+    - method
+    """
+    fusion_methods[method.name] = method
+    return method
+
+def get_method(name):
+    """
+    Obtiene un método registrado.
+
+    Parameters:
+    - name: Nombre del método.
+
+    Returns:
+    - FusionMethod registrado.
+    """
+    if name not in fusion_methods:
+        raise ValueError(f"Método de fusión desconocido: {name}")
+    return fusion_methods[name]
+
+def run_method(name, ms, pan, out=None, tile_size=1024, dtype=np.float64, workers=1, ms_indexes=None,
+               pan_index=1, **params):
+    """
+    Ejecuta un método registrado con el ejecutor por teselas.
+
+    Parameters:
+    - name: Nombre del método.
+    - ms: DatasetReader o arreglo (bandas, filas, columnas) multiespectral a la resolución de la pancromática.
+    - pan: DatasetReader o arreglo 2D de la pancromática (de 8 bits para los métodos que igualan histogramas).
+    - out: DatasetWriter de rasterio o arreglo (bandas, filas, columnas) de salida; si es None
+      se crea un arreglo de tipo dtype.
+    - tile_size: Lado de las teselas sin contar el halo (por defecto 1024); se redondea hacia
+      arriba a la alineación del método.
+    - dtype: Tipo de dato de punto flotante del cálculo (por defecto np.float64).
+    - workers: Número de hilos que procesan teselas (por defecto 1).
+    - ms_indexes: Bandas multiespectrales a leer (por defecto todas).
+    - pan_index: Banda de la pancromática cuando pan es un DatasetReader (por defecto 1).
+    - params: Parámetros propios del método (p. ej. levels para à trous).
+
+    Returns:
+    - out: Imagen fusionada (bandas, filas, columnas).
+    """
+    method = get_method(name)
+    if np.dtype(dtype) not in method.dtypes:
+        raise ValueError(f"El método {name} no admite el tipo de dato {np.dtype(dtype)}")
+    tile_size = method.get_tile_size(tile_size, **params)
+    stats = None
+    if method.statistics is not None:
+        stats = method.statistics(ms, pan, tile_size, ms_indexes=ms_indexes, pan_index=pan_index, **params)
+    if out is None:
+        if ms_indexes is not None:
+            n_band = len(ms_indexes)
+        else:
+            n_band = ms.shape[0] if isinstance(ms, np.ndarray) else ms.count
+        out = np.empty((n_band, *pan.shape[-2:]), dtype=dtype)
+    dtype = np.dtype(dtype).type
+    return run_tiled(lambda ms_tile, pan_tile: method.kernel(ms_tile, pan_tile, stats, dtype, **params),
+                     ms, pan, out, tile_size, method.get_halo(**params), ms_indexes, pan_index, workers)
+
+def benchmark_method(name, ms, pan, tile_size=1024, dtype=np.float64, workers=1, **params):
+    """
+    Mide el tiempo y el pico de memoria de un método registrado sobre un arreglo de salida preasignado.
+
+    Parameters:
+    - name: Nombre del método.
+    - ms: Arreglo (bandas, filas, columnas) multiespectral.
+    - pan: Arreglo 2D de la pancromática.
+    - tile_size: Lado de las teselas sin contar el halo (por defecto 1024).
+    - dtype: Tipo de dato de punto flotante del cálculo (por defecto np.float64).
+    - workers: Número de hilos que procesan teselas (por defecto 1).
+    - params: Parámetros propios del método.
+
+    Returns:
+    - Tupla (segundos, pico de memoria en MB).
+    """
+    out = np.empty((ms.shape[0], *pan.shape[-2:]), dtype=dtype)
+    tracemalloc.start()
+    start = time.perf_counter()
+    run_method(name, ms, pan, out, tile_size, dtype, workers, **params)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return elapsed, peak
+
+# ========== Métodos incluidos ==========
+
+def _intensity_lut(ms, pan, tile_size, ms_indexes=None, pan_index=1, **params):
+    """
+    Estadística global de IHS y à trous: tabla que iguala el histograma de la pancromática de 8 bits
+    al de la intensidad (R+G+B)/3, calculada por teselas.
+    """
+    height, width = pan.shape[-2:]
+    pan_indexes = None if isinstance(pan, np.ndarray) else pan_index
+    pan_hist, intensity_hist = np.zeros(256, dtype=np.int64), np.zeros(3 * 255 + 1, dtype=np.int64)
+    for window, _, _ in iter_tiles(height, width, tile_size):
+        ms_tile = read_window(ms, window, ms_indexes)
+        pan_hist += integer_histogram(read_window(pan, window, pan_indexes), minlength=256)
+        intensity_hist += integer_histogram(ms_tile[0:3].sum(axis=0, dtype=np.int64), minlength=3 * 255 + 1)
+    return histogram_lut(pan_hist, intensity_hist, reference_scale=3)
+
+def _ihs_kernel(ms_tile, pan_tile, lut, dtype):
+    """
+    Núcleo de IHS: iguala la pancromática con la tabla global y aplica la fusión IHS aditiva.
+    """
+    fused = fusion_ihs_fast(np.moveaxis(ms_tile, 0, 2), lut[pan_tile], out_dtype=dtype, dtype=dtype)
+    return np.moveaxis(fused, 2, 0)
+
+def _wavelet_kernel(ms_tile, pan_tile, lut, dtype, levels=5, backend='separable'):
+    """
+    Núcleo à trous: iguala la pancromática con la tabla global y aplica fusion_twa_multiband.
+    """
+    fused = fusion_twa_multiband(np.moveaxis(ms_tile, 0, 2), lut[pan_tile].astype(dtype), levels,
+                                 backend=backend, dtype=dtype)
+    return np.moveaxis(fused, 2, 0)
+
+def _hpf_kernel(ms_tile, pan_tile, lut, dtype, radius=2):
+    """
+    Núcleo HPF: iguala la pancromática con la tabla global y aplica fusion_hpf_multiband.
+    """
+    fused = fusion_hpf_multiband(np.moveaxis(ms_tile, 0, 2), lut[pan_tile], radius, dtype)
+    return np.moveaxis(fused, 2, 0)
+
+def _guided_kernel(ms_tile, pan_tile, lut, dtype, radius=2, eps=100.0):
+    """
+    Núcleo de filtro guiado: iguala la pancromática con la tabla global y aplica fusion_guided_multiband.
+    """
+    fused = fusion_guided_multiband(np.moveaxis(ms_tile, 0, 2), lut[pan_tile], radius, eps, dtype)
+    return np.moveaxis(fused, 2, 0)
+
+def _glp_kernel(ms_tile, pan_tile, lut, dtype, levels=2, gain=0.3):
+    """
+    Núcleo MTF-GLP: iguala la pancromática con la tabla global y aplica fusion_glp_multiband.
+    """
+    fused = fusion_glp_multiband(np.moveaxis(ms_tile, 0, 2), lut[pan_tile], levels, gain=gain, dtype=dtype)
+    return np.moveaxis(fused, 2, 0)
+
+def _cs_statistics(method):
+    """
+    Adapta las estadísticas y parámetros de un método de data_fusion.cs a la interfaz del registro.
+    """
+    parameters, _ = cs_methods[method]
+    return lambda ms, pan, tile_size, ms_indexes=None, pan_index=1, subsample=1: parameters(
+        band_statistics(ms, pan, tile_size, ms_indexes, pan_index, subsample))
+
+def _cs_kernel(method):
+    """
+    Adapta el núcleo de un método de data_fusion.cs a la interfaz del registro.
+    """
+    _, kernel = cs_methods[method]
+    return lambda ms_tile, pan_tile, params, dtype, subsample=1: kernel(ms_tile, pan_tile, params, dtype)
+
+register_method(FusionMethod('ihs', 'IHS', _ihs_kernel, statistics=_intensity_lut))
+register_method(FusionMethod('wavelet', 'Atrous Wavelet', _wavelet_kernel,
+                             halo=lambda levels=5, **params: twa_halo(levels), statistics=_intensity_lut,
+                             prefix='WAV'))
+register_method(FusionMethod('hpf', 'HPF (filtro de caja)', _hpf_kernel,
+                             halo=lambda radius=2, **params: radius, statistics=_intensity_lut))
+# The guided filter chains two box filters, so it needs twice the radius
+register_method(FusionMethod('guided', 'Filtro guiado', _guided_kernel,
+                             halo=lambda radius=2, **params: 2 * radius, statistics=_intensity_lut))
+# The halo and the tiles are multiples of 2**levels so that tiles keep the decimation phase
+register_method(FusionMethod('glp', 'MTF-GLP', _glp_kernel,
+                             halo=lambda levels=2, gain=0.3, **params: glp_halo(levels, gain=gain),
+                             statistics=_intensity_lut,
+                             alignment=lambda levels=2, **params: 2 ** levels))
+for _name, _label in (('gihs', 'GIHS'), ('brovey', 'Brovey'), ('pca', 'PCA'), ('gs', 'Gram-Schmidt')):
+    register_method(FusionMethod(_name, _label, _cs_kernel(_name), statistics=_cs_statistics(_name)))
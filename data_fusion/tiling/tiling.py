@@ -0,0 +1,120 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from rasterio.windows import Window
+from data_fusion.conversion.conversion import saturate_cast
+
+def iter_tiles(height, width, tile_size, halo=0):
+    """
+    Recorre una escena en teselas cuadradas con un margen (halo) de solapamiento.
+
+    Parameters:
+    - height: Número de filas de la escena.
+    - width: Número de columnas de la escena.
+    - tile_size: Lado de cada tesela sin contar el halo.
+    - halo: Número de píxeles que se leen alrededor de cada tesela (recortado al borde de la escena).
+
+    Returns:
+    - Generador de tuplas (read_window, write_window, inner), donde read_window es la ventana
+      a leer con halo, write_window la ventana de la tesela en la escena e inner las slices
+      (filas, columnas) de la tesela dentro de lo leído.
+    """
+    for row in range(0, height, tile_size):
+        for col in range(0, width, tile_size):
+            rows = min(tile_size, height - row)
+            cols = min(tile_size, width - col)
+            row_off = max(row - halo, 0)
+            col_off = max(col - halo, 0)
+            row_end = min(row + rows + halo, height)
+            col_end = min(col + cols + halo, width)
+            read_window = Window(col_off, row_off, col_end - col_off, row_end - row_off)
+            write_window = Window(col, row, cols, rows)
+            inner = (slice(row - row_off, row - row_off + rows), slice(col - col_off, col - col_off + cols))
+            yield read_window, write_window, inner
+
+def read_window(source, window, indexes=None):
+    """
+    Lee una ventana de un raster de rasterio o de un arreglo en memoria.
+
+    Parameters:
+    - source: DatasetReader de rasterio, arreglo 2D (filas, columnas) o 3D (bandas, filas, columnas).
+    - window: Ventana de rasterio a leer.
+    - indexes: Bandas a leer (índices desde 1, como en rasterio). Un entero devuelve un arreglo 2D.
+
+    Returns:
+    - Arreglo con los datos de la ventana.
+    """
+    if not isinstance(source, np.ndarray):
+        return source.read(indexes, window=window)
+    rows, cols = window.toslices()
+    if source.ndim == 2:
+        return source[rows, cols]
+    if indexes is None:
+        return source[:, rows, cols]
+    if isinstance(indexes, int):
+        return source[indexes - 1, rows, cols]
+    return source[[ix - 1 for ix in indexes], rows, cols]
+
+def write_window(destination, data, window):
+    """
+    Escribe una ventana (bandas, filas, columnas) en un raster de rasterio abierto en escritura o en un arreglo.
+
+    Los datos se convierten al tipo del destino con saturate_cast, así los valores fuera del rango
+    de un destino entero se recortan en lugar de desbordarse.
+
+    Parameters:
+    - destination: DatasetWriter de rasterio o arreglo (bandas, filas, columnas).
+    - data: Datos de la ventana (bandas, filas, columnas).
+    - window: Ventana de rasterio donde se escriben los datos.
+
+    Returns:
+    - None
+    """
+    if isinstance(destination, np.ndarray):
+        rows, cols = window.toslices()
+        saturate_cast(data, destination.dtype, out=destination[:, rows, cols])
+    else:
+        destination.write(saturate_cast(data, destination.dtypes[0]), window=window)
+
+def run_tiled(kernel, ms, pan, out, tile_size=1024, halo=0, ms_indexes=None, pan_index=1, workers=1):
+    """
+    Ejecuta un núcleo de fusión tesela por tesela sobre una imagen multiespectral y una pancromática.
+
+    Es el ejecutor común de los métodos de fusión: lee cada tesela con su halo, aplica el núcleo
+    y escribe solo el interior, así la memoria depende del tamaño de tesela y no de la escena.
+
+    Parameters:
+    - kernel: Función kernel(ms_tile, pan_tile) que devuelve la tesela fusionada (bandas, filas, columnas).
+    - ms: DatasetReader o arreglo (bandas, filas, columnas) multiespectral a la resolución de la pancromática.
+    - pan: DatasetReader o arreglo 2D de la pancromática.
+    - out: DatasetWriter de rasterio o arreglo (bandas, filas, columnas) de salida.
+    - tile_size: Lado de las teselas sin contar el halo (por defecto 1024).
+    - halo: Margen que necesita el núcleo a cada lado de la tesela (por defecto 0).
+    - ms_indexes: Bandas multiespectrales a leer (por defecto todas).
+    - pan_index: Banda de la pancromática cuando pan es un DatasetReader (por defecto 1).
+    - workers: Número de hilos que aplican el núcleo; las lecturas y escrituras se hacen en el
+      hilo principal y como máximo hay 2*workers teselas en memoria (por defecto 1).
+
+    Returns:
+    - out: Salida con la imagen fusionada.
+    """
+    height, width = pan.shape[-2:]
+    pan_indexes = None if isinstance(pan, np.ndarray) else pan_index
+    tiles = iter_tiles(height, width, tile_size, halo)
+    if workers <= 1:
+        for read_win, write_win, inner in tiles:
+            fused = kernel(read_window(ms, read_win, ms_indexes), read_window(pan, read_win, pan_indexes))
+            write_window(out, fused[:, inner[0], inner[1]], write_win)
+        return out
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for read_win, write_win, inner in tiles:
+            future = pool.submit(kernel, read_window(ms, read_win, ms_indexes), read_window(pan, read_win, pan_indexes))
+            pending.append((future, write_win, inner))
+            if len(pending) >= 2 * workers:
+                future, write_win, inner = pending.popleft()
+                write_window(out, future.result()[:, inner[0], inner[1]], write_win)
+        while pending:
+            future, write_win, inner = pending.popleft()
+            write_window(out, future.result()[:, inner[0], inner[1]], write_win)
+    return out
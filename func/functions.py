@@ -6,6 +6,11 @@ import numpy as np
 import rasterio
 from rasterio.plot import show
 from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window
+from data_fusion.tiling.tiling import iter_tiles, read_window
+from data_fusion.histogram.histogram import binned_histogram
+from data_fusion.conversion.conversion import saturate_cast, merge_bands_saturated
 
 # Función para obtener las bandas RGB de una imagen satelital
 get_RGB_bands_satellite = lambda src: [src.read(4),src.read(3),src.read(2)]
@@ -22,50 +27,180 @@ ndarray_rgb = lambda r,g,b: np.dstack((r, g, b)) #Concatena RGB con numpy
 # Función para concatenar bandas RGB y formar una imagen RGB utilizando OpenCV
 rgb_img = lambda red,green,blue : cv2.merge([red,green,blue]) #Concatena RGB con openCv
 
-# Función para procesar una imagen aplicando una máscara y generando una nueva imagen
-process_imag_to_another_model = lambda img, mask: np.dstack([
-    sum((value*img[:,:,channel]) 
-        for value,channel in zip(row,range(img.astype(float).shape[2])))
-    for row in mask])
+class MultibandImage:
+    """
+    Imagen multibanda en un único búfer contiguo (bandas, filas, columnas), en memoria o en un memmap.
+
+    Las bandas se obtienen por nombre como vistas del búfer, sin copias; reemplaza a las funciones
+    que separan las bandas en listas y a ndarray_rgb/rgb_img que las vuelven a unir.
 
-def show_images(images: list, path, cmap:str = None):
+    Attributes:
+    - data: Búfer (bandas, filas, columnas).
+    - band_names: Nombres de las bandas en el orden del búfer.
+    """
+
+    def __init__(self, data:np.ndarray, band_names=('R','G','B','NIR')):
+        self.data = data
+        self.band_names = tuple(band_names)[:data.shape[0]]
+
+    @classmethod
+    def from_reader(cls, src, indexes=None, band_names=('R','G','B','NIR'), path=None, tile_size:int = 1024):
+        """
+        Lee las bandas de un DatasetReader (o WarpedVRT) en un búfer contiguo.
+
+        Parameters:
+        - src: DatasetReader de rasterio.
+        - indexes: Bandas a leer, en el orden de band_names (por defecto todas).
+        - band_names: Nombres de las bandas leídas (por defecto ('R', 'G', 'B', 'NIR')).
+        - path: Ruta opcional de un memmap; si se indica, el búfer vive en disco y se llena por teselas.
+        - tile_size: Lado de las teselas al llenar el memmap (por defecto 1024).
+
+        Returns:
+        - MultibandImage con las bandas leídas.
+        """
+        if indexes is None:
+            indexes = list(range(1, src.count + 1))
+        indexes = list(indexes)
+        if path is None:
+            return cls(src.read(indexes), band_names)
+        data = np.memmap(path, dtype=src.dtypes[indexes[0] - 1], mode='w+',
+                         shape=(len(indexes), src.height, src.width))
+        for _, window, _ in iter_tiles(src.height, src.width, tile_size):
+            rows, cols = window.toslices()
+            data[:, rows, cols] = src.read(indexes, window=window)
+        return cls(data, band_names)
+
+    def _index(self, band):
+        return self.band_names.index(band) if isinstance(band, str) else band
+
+    def __getitem__(self, band) -> np.ndarray:
+        """
+        Obtiene una banda (por nombre o posición) como vista 2D del búfer.
+        """
+        return self.data[self._index(band)]
+
+    def bands(self, names=None) -> np.ndarray:
+        """
+        Obtiene varias bandas (bandas, filas, columnas); es una vista cuando sus posiciones están
+        equiespaciadas en el búfer (p. ej. R, G, B o B, G, R) y una copia en otro caso.
+        """
+        if names is None:
+            return self.data
+        positions = [self._index(band) for band in names]
+        steps = set(np.diff(positions)) or {1}
+        step = steps.pop()
+        if steps or step == 0:
+            return self.data[positions]
+        stop = positions[-1] + (1 if step > 0 else -1)
+        return self.data[positions[0]:stop if stop >= 0 else None:step]
+
+    def pixels(self, names=None) -> np.ndarray:
+        """
+        Obtiene las bandas con disposición (filas, columnas, bandas), como ndarray_rgb, sin copiar el búfer.
+        """
+        return np.moveaxis(self.bands(names), 0, 2)
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+def process_imag_to_another_model(img, mask, dtype=np.float64, out=None, chunk_rows=1024):
+    """
+    Procesa una imagen aplicando una máscara (matriz de transformación) y genera una nueva imagen.
+
+    Cada píxel se multiplica por la matriz con una sola multiplicación matricial (BLAS) sobre
+    bloques de filas, así la memoria adicional queda acotada por el tamaño del bloque.
+
+    Parameters:
+    - img: Imagen de entrada (filas, columnas, canales).
+    - mask: Matriz de transformación; cada fila produce un canal de salida.
+    - dtype: Tipo de dato de punto flotante del cálculo (por defecto np.float64).
+    - out: Arreglo de salida opcional (filas, columnas, filas de la máscara).
+    - chunk_rows: Número de filas procesadas por bloque (por defecto 1024).
+
+    Returns:
+    - out: Imagen transformada (filas, columnas, filas de la máscara).
+    """
+    matrix = np.asarray(mask, dtype=dtype)
+    if out is None:
+        out = np.empty((img.shape[0], img.shape[1], matrix.shape[0]), dtype=dtype)
+    for row in range(0, img.shape[0], chunk_rows):
+        rows = slice(row, row + chunk_rows)
+        block = img[rows].astype(dtype, copy=False)
+        if out.dtype == dtype:
+            np.matmul(block, matrix.T, out=out[rows])
+        else:
+            out[rows] = block @ matrix.T
+    return out
+
+def preview_image(image, max_pixels:int = 2**21):
+    """
+    Obtiene una versión reducida de una imagen con a lo sumo unos max_pixels píxeles para mostrarla.
+
+    Con un arreglo se toma una vista diezmada con paso fijo (sin copias); con un DatasetReader
+    se lee con out_shape y remuestreo al vecino más cercano, así GDAL usa las vistas generales
+    (overviews) del archivo si existen. El costo no depende del tamaño de la escena.
+
+    Parameters:
+    - image: Arreglo 2D, arreglo 3D (bandas, filas, columnas) o DatasetReader de rasterio.
+    - max_pixels: Número máximo aproximado de píxeles por banda (por defecto 2**21).
+
+    Returns:
+    - Imagen reducida.
+    """
+    rows, cols = image.shape[-2:]
+    step = max(1, int(np.ceil(np.sqrt(rows * cols / max_pixels))))
+    if isinstance(image, np.ndarray):
+        return image[..., ::step, ::step]
+    return image.read(out_shape=(image.count, -(-rows // step), -(-cols // step)), resampling=Resampling.nearest)
+
+def show_images(images: list, path, cmap:str = None, max_pixels:int = 2**21):
     """
     Muestra las imágenes proporcionadas en una fila y guarda la figura.
 
+    Cada imagen se reduce antes con preview_image, así matplotlib no dibuja la resolución completa.
+
     Parameters:
-    - images: Lista de imágenes.
+    - images: Lista de imágenes (arreglos o DatasetReader).
     - path: Ruta para guardar la figura.
     - cmap: Mapa de colores para mostrar las imágenes (opcional).
+    - max_pixels: Número máximo aproximado de píxeles por imagen (por defecto 2**21).
 
     Returns:
     - None
     """
     fig, axs = pyplot.subplots(ncols=len(images), nrows=1, figsize=(20, 10), sharey=True)
+    previews = [preview_image(image, max_pixels) for image in images]
     if cmap:
         for ix,axn in enumerate(axs):
-            show(images[ix], cmap=cmap, ax=axn)
+            show(previews[ix], cmap=cmap, ax=axn)
     else:
         for ix,axn in enumerate(axs):
-            show(images[ix], ax=axn)
+            show(previews[ix], ax=axn)
     for ix,axn in enumerate(axs):
         axn.set_title(f"Imagen {ix}")
     pyplot.savefig(os.path.join(path,'Figura de imágenes - Pan - Igualacion - I.png'), dpi='figure', format=None, bbox_inches='tight')
 
-def show_hist(images: list, path, color:str = 'b'):
+def show_hist(images: list, path, color:str = 'b', tile_size:int = 1024):
     """
     Muestra los histogramas de las imágenes proporcionadas en una fila y guarda la figura.
 
+    Los conteos se calculan por teselas con binned_histogram (np.bincount para enteros), sin
+    aplanar ni copiar las imágenes, y son los mismos que daría pyplot.hist con 20 intervalos.
+
     Parameters:
-    - images: Lista de imágenes.
+    - images: Lista de imágenes (arreglos 2D o DatasetReader).
     - path: Ruta para guardar la figura.
     - color: Color para los histogramas (opcional).
+    - tile_size: Lado de las teselas para calcular los histogramas (por defecto 1024).
 
     Returns:
     - None
     """
     fig, axs = pyplot.subplots(ncols=len(images), nrows=1, figsize=(16,9), sharey=True)
     for ix,axn in enumerate(axs):
-        axn.hist(images[ix].flatten(), color=color, alpha=0.5, bins=20)
+        counts, edges = binned_histogram(images[ix], 20, tile_size)
+        axn.stairs(counts, edges, color=color, alpha=0.5, fill=True)
     for ix,axn in enumerate(axs):
         axn.set_title(f"Histograma {ix}")
     pyplot.savefig(os.path.join(path,'Histograma Pan - Igualacion - I.png'), dpi='figure', format=None, bbox_inches='tight')
@@ -106,7 +241,137 @@ def get_pancromatica(spatial_image_src: rasterio.io.DatasetReader) -> np.ndarray
     Returns:
     - pancromatica: Banda pancromática.
     """
-    return  (sum(spatial_image_src.read(n).astype('float') for n in [1,2,3])/3).astype('uint8')
+    return pancromatica_window(spatial_image_src)
+
+def spectral_response_weights(band_responses, pan_response) -> np.ndarray:
+    """
+    Obtiene los pesos de cada banda para sintetizar la pancromática a partir de las respuestas espectrales del sensor.
+
+    El peso de cada banda es el solapamiento de su respuesta con la de la pancromática
+    (suma de productos sobre una malla común de longitudes de onda), normalizado a suma 1.
+
+    Parameters:
+    - band_responses: Respuestas espectrales de las bandas (bandas, longitudes de onda).
+    - pan_response: Respuesta espectral de la pancromática (longitudes de onda).
+
+    Returns:
+    - weights: Pesos float32 de cada banda.
+    """
+    overlap = np.asarray(band_responses, dtype=np.float64) @ np.asarray(pan_response, dtype=np.float64)
+    if overlap.sum() <= 0:
+        raise ValueError("Las respuestas espectrales de las bandas no se solapan con la pancromática")
+    return (overlap / overlap.sum()).astype(np.float32)
+
+def pancromatica_window(src, window=None, indexes=(1,2,3), weights=None, dtype='uint8') -> np.ndarray:
+    """
+    Sintetiza la pancromática como promedio ponderado de bandas, leyendo todas las bandas en una sola lectura.
+
+    Con pesos enteros (por defecto 1 por banda) se acumula en enteros y se divide de forma entera
+    por la suma de pesos, lo que reproduce el promedio truncado original; con pesos reales se
+    acumula en float32. El resultado se recorta al rango de dtype.
+
+    Parameters:
+    - src: DatasetReader de rasterio o arreglo (bandas, filas, columnas).
+    - window: Ventana de rasterio a sintetizar (por defecto la imagen completa).
+    - indexes: Bandas a promediar (índices desde 1, por defecto (1, 2, 3)).
+    - weights: Pesos de cada banda, enteros o reales (por defecto 1 por banda).
+    - dtype: Tipo de dato entero de salida (por defecto 'uint8').
+
+    Returns:
+    - pancromatica: Banda pancromática de la ventana.
+    """
+    indexes = list(indexes)
+    if window is None:
+        window = Window(0, 0, src.shape[-1], src.shape[-2])
+    bands = read_window(src, window, indexes)
+    weights = np.ones(len(indexes), dtype=np.int64) if weights is None else np.asarray(weights)
+    if len(weights) != len(indexes):
+        raise ValueError(f"Se esperaban {len(indexes)} pesos, se recibieron {len(weights)}")
+    if np.issubdtype(weights.dtype, np.integer) and np.issubdtype(bands.dtype, np.integer):
+        # Largest possible sum decides between 32 and 64 bit accumulators
+        acc_dtype = np.uint32 if int(np.iinfo(bands.dtype).max) * int(weights.sum()) < 2**32 else np.uint64
+    else:
+        acc_dtype = np.float32
+    pan = np.zeros(bands.shape[1:], dtype=acc_dtype)
+    scratch = np.empty(bands.shape[1:], dtype=acc_dtype)
+    for band, weight in zip(bands, weights):
+        np.multiply(band, weight, out=scratch, dtype=acc_dtype, casting='unsafe')
+        np.add(pan, scratch, out=pan)
+    if acc_dtype is np.float32:
+        pan /= np.float32(weights.sum())
+    else:
+        pan //= acc_dtype(weights.sum())
+    return saturate_cast(pan, dtype)
+
+def iter_pancromatica(src, tile_size:int = 1024, indexes=(1,2,3), weights=None, dtype='uint8'):
+    """
+    Sintetiza la pancromática tesela por tesela con pancromatica_window.
+
+    Parameters:
+    - src: DatasetReader de rasterio o arreglo (bandas, filas, columnas).
+    - tile_size: Lado de las teselas (por defecto 1024).
+    - indexes: Bandas a promediar (por defecto (1, 2, 3)).
+    - weights: Pesos de cada banda (por defecto 1 por banda).
+    - dtype: Tipo de dato entero de salida (por defecto 'uint8').
+
+    Returns:
+    - Generador de tuplas (ventana, pancromática de la ventana).
+    """
+    height, width = src.shape[-2:]
+    for _, window, _ in iter_tiles(height, width, tile_size):
+        yield window, pancromatica_window(src, window, indexes, weights, dtype)
+
+def write_pancromatica(src, dst_path, tile_size:int = 1024, indexes=(1,2,3), weights=None, dtype='uint8'):
+    """
+    Escribe la pancromática sintetizada en un GeoTIFF de una banda, tesela por tesela.
+
+    Parameters:
+    - src: DatasetReader de rasterio.
+    - dst_path: Ruta del GeoTIFF de salida.
+    - tile_size: Lado de las teselas (por defecto 1024).
+    - indexes: Bandas a promediar (por defecto (1, 2, 3)).
+    - weights: Pesos de cada banda (por defecto 1 por banda).
+    - dtype: Tipo de dato entero de salida (por defecto 'uint8').
+
+    Returns:
+    - dst_path: Ruta del GeoTIFF escrito.
+    """
+    profile = src.profile
+    profile.update(driver='GTiff', count=1, dtype=dtype)
+    with rasterio.open(dst_path, 'w', **profile) as dst:
+        for window, pan in iter_pancromatica(src, tile_size, indexes, weights, dtype):
+            dst.write(pan, 1, window=window)
+    return dst_path
+
+class PancromaticaSource:
+    """
+    Pancromática sintetizada bajo demanda con la interfaz de lectura de rasterio.
+
+    Se puede pasar como pan a run_method, run_tiled o fusion_twa_tiled: cada tesela de la fusión
+    sintetiza solo su ventana, así la pancromática se produce en la misma pasada que la fusión.
+
+    Attributes:
+    - src: DatasetReader de rasterio o arreglo (bandas, filas, columnas) de origen.
+    - indexes: Bandas a promediar.
+    - weights: Pesos de cada banda.
+    - dtype: Tipo de dato entero de salida.
+    """
+
+    def __init__(self, src, indexes=(1,2,3), weights=None, dtype='uint8'):
+        self.src = src
+        self.indexes = indexes
+        self.weights = weights
+        self.dtype = dtype
+        self.count = 1
+        self.shape = tuple(src.shape[-2:])
+        self.height, self.width = self.shape
+
+    def read(self, indexes=None, window=None):
+        """
+        Lee una ventana de la pancromática; como en rasterio, con indexes entero devuelve un arreglo 2D.
+        """
+        pan = pancromatica_window(self.src, window, self.indexes, self.weights, self.dtype)
+        return pan if isinstance(indexes, int) else pan[np.newaxis]
 
 def get_equalized_panchromatic(image:np.ndarray) -> list[np.ndarray, np.ndarray]:
     """
@@ -152,6 +417,42 @@ def resampling_spectral(src,height:int, width:int, interpolation_type:str):
     metadata['height'] = height
     return [src_inter, metadata]
 
+def resampling_spectral_vrt(src, height:int, width:int, interpolation_type:str):
+    """
+    Remuestrea la imagen espectral a una nueva altura y ancho bajo demanda, sin leerla completa.
+
+    Devuelve un WarpedVRT de rasterio en la malla de la imagen remuestreada: cada lectura con
+    window entrega solo esa ventana ya interpolada, así el cubo completo a la resolución del dron
+    nunca se guarda en memoria. Se usa en lugar de resampling_spectral con run_method y
+    fusion_twa_tiled; el VRT debe cerrarse antes que src.
+
+    Parameters:
+    - src: Objeto DatasetReader de rasterio.
+    - height: Nueva altura.
+    - width: Nuevo ancho.
+    - interpolation_type: Tipo de interpolación.
+
+    Returns:
+    - List con el WarpedVRT remuestreado y metadatos.
+    """
+    new_transform = src.transform * src.transform.scale(
+        (src.width / width),
+        (src.height / height)
+    )
+    src_vrt = WarpedVRT(
+        src,
+        crs=src.crs,
+        transform=new_transform,
+        width=int(width),
+        height=int(height),
+        resampling=Resampling[interpolation_type]
+    )
+    metadata = src.profile
+    metadata['transform'] = new_transform
+    metadata['width'] = width
+    metadata['height'] = height
+    return [src_vrt, metadata]
+
 def merge_bands(imageRBG:np.ndarray,list_new_bands:list[np.ndarray]) -> np.ndarray:
     """
     Fusiona las bandas RGB con nuevas bandas y devuelve una nueva imagen RGB.
@@ -163,4 +464,4 @@ def merge_bands(imageRBG:np.ndarray,list_new_bands:list[np.ndarray]) -> np.ndarr
     Returns:
     - Nueva imagen RGB.
     """
-    return  np.dstack((imageRBG,*list_new_bands))
\ No newline at end of file
+    return  np.dstack((imageRBG,*list_new_bands))
@@ -2,17 +2,16 @@ from func.functions import *
 from dotenv import load_dotenv, find_dotenv
 import os
 import csv
-from skimage.exposure import match_histograms
 import numpy as np
-from math import sqrt
 import matplotlib.pyplot as plt
 from data_fusion.ihs.ihs import rgb_to_ihs
-from data_fusion.a_wavelet.a_wavelet import fusion_twa_multiband
+from data_fusion.registry.registry import fusion_methods, run_method
+from data_fusion.histogram.histogram import match_histograms_lut
 from data_fusion.evaluacion.evaluacion_calidad import (
     test_full_references,
     test_no_references,
-    spectral_ERGAS,
-    spatial_ERGAS
+    windowed_ERGAS,
+    windowed_spectral_ERGAS
 )
 
 # ========== Carga de Direcciones y Variables de Entorno ==========
@@ -29,6 +28,9 @@ dir_file_proccesed_images = os.path.join(path_root, dir_file_type, 'processed_im
 spatial_imagen_name = os.getenv("name_image_spatial")
 spectral_imagen_name = os.getenv("name_image_spectral")
 
+# Tipo de dato de punto flotante de toda la fusión (float32 reduce a la mitad la memoria)
+dtype_fusion = np.dtype(os.getenv("dtype_fusion", "float64"))
+
 # ========== Carga de Imágenes ==========
 
 spatial_src = read_tif_image(dir_file_original_images_spatial, spatial_imagen_name)
@@ -36,119 +38,116 @@ spectral_src = read_tif_image(dir_file_original_images_spectral, spectral_imagen
 
 # ========== Preprocesamiento de Imágenes ==========
 
-inter_spectral, metadata = resampling_spectral(spectral_src, spatial_src.height, spatial_src.width, 'bilinear') 
-spectral_src.close()
+# La imagen espectral remuestreada y la pancromática se leen por ventanas bajo demanda,
+# ninguna se carga completa a la resolución del dron
+spectral_vrt, metadata = resampling_spectral_vrt(spectral_src, spatial_src.height, spatial_src.width, 'bilinear')
+pancromatica_src = PancromaticaSource(spatial_src)
 
 # ========== Extracción de Bandas y Creación de Falsos Colores ==========
 
 print("========== Iniciando Fusión de Datos ==========")
-bands = get_RGB_bands_satellite_ndarray_and_other_bands(inter_spectral)
-[red, green, blue] = bands[0:3]
-other_bands = bands[3:]
-image_rgb = ndarray_rgb(red, green, blue)
+# Los diagnósticos usan vistas reducidas de ambas imágenes
+spectral_preview = MultibandImage(preview_image(spectral_vrt))
+image_rgb = spectral_preview.pixels(('R', 'G', 'B'))
 
 # ========== Creación de la Falsa Pancromática ==========
 
-pancromatica = get_pancromatica(spatial_src)
-spatial_src.close()
-pancromatica = pancromatica.astype(np.float64)
+pancromatica_preview = pancromatica_window(preview_image(spatial_src))
 
 # ========== Conversión RGB a IHS e Igualación de Histogramas ==========
 
-iv1v2 = rgb_to_ihs(image_rgb)
-iv1v2 = iv1v2.astype(np.float64)
-pan_i = match_histograms(pancromatica, iv1v2[:, :, 0])
-show_images([pancromatica, pan_i, iv1v2[:, :, 0]], dir_file_proccesed_images, 'gray')
-show_hist([pancromatica, pan_i, iv1v2[:, :, 0]], dir_file_proccesed_images, 'gray')
+iv1v2 = rgb_to_ihs(image_rgb, dtype_fusion)
+# La intensidad (R+G+B)/3 de bandas de 8 bits toma valores k/3, por eso la escala 3
+pan_i = match_histograms_lut(pancromatica_preview, iv1v2[:, :, 0], reference_scale=3, dtype=dtype_fusion)
+show_images([pancromatica_preview, pan_i, iv1v2[:, :, 0]], dir_file_proccesed_images, 'gray')
+show_hist([pancromatica_preview, pan_i, iv1v2[:, :, 0]], dir_file_proccesed_images, 'gray')
 
 # ========== Selección del Método de Fusión ==========
 
 nombre_resultado_imagen = os.getenv("name_imagen")
-option = 0
+methods = list(fusion_methods.values())
+menu = "".join(f" {ix}. {method.label}\n" for ix, method in enumerate(methods, start=1))
 while True:
-    option = input("Escoja el método de fusión:\n 1. IHS\n 2. Atrous Wavelet\n")
-    if option == "1" or option == "2":
+    option = input(f"Escoja el método de fusión:\n{menu}")
+    if option.isdigit() and 1 <= int(option) <= len(methods):
         break
     print("Opción incorrecta")
-
-pan_v1_v2 = iv1v2.copy()
-
-if option == "1":
-    # ========== Fusión con Método IHS ==========
-
-    pan_v1_v2[:, :, 0] = pan_i
-
-    print("Conversión de IHS a RGB")
-    mask_matrix_to_rgb = [[1, 1/sqrt(6), 1/sqrt(6)], [1, 1/sqrt(6), -1/2], [1, -2/sqrt(6), 0]]
-    merged_rgb_image = process_imag_to_another_model(pan_v1_v2, mask_matrix_to_rgb)
-    print("Guardando datos fusionados")
-    merged_rgb_image_8bits = merged_rgb_image.astype('uint8')
-    new_spectral_image = merge_bands(merged_rgb_image_8bits, other_bands)
-    resultado_name = f"{'IHS'}_{nombre_resultado_imagen}"
-    with rasterio.open(os.path.join(dir_file_proccesed_images, f"{resultado_name}"),
-                       'w',
-                       **metadata,
-                       ) as dst:
-        for ix in range(new_spectral_image.shape[2]):
-            dst.write(new_spectral_image[:, :, ix], ix+1)
-
-elif option == "2":
-    # ========== Fusión con Método Atrous Wavelet ==========
-
-    fused_image_w = fusion_twa_multiband(image_rgb, pan_i, 5)
-    print("Guardando datos fusionados")
-    resultado_name = f"{'WAV'}_{nombre_resultado_imagen}"
-    with rasterio.open(os.path.join(dir_file_proccesed_images, f"{resultado_name}"),
-                       'w',
-                       **metadata,
-                       ) as dst:
-        for ix in range(fused_image_w.shape[2]):
-            dst.write(fused_image_w[:, :, ix], ix+1)
+method = methods[int(option) - 1]
+
+# ========== Fusión con el Método Seleccionado ==========
+
+print(f"Fusión con {method.label}")
+# Parámetros propios del método; à trous usa el motor de convolución automático por defecto
+method_params = {}
+if method.name == 'wavelet':
+    method_params['backend'] = os.getenv("backend_fusion", "auto")
+resultado_name = f"{method.prefix}_{nombre_resultado_imagen}"
+# Cada tesela fusionada se recorta al tipo de salida y se escribe directamente en el GeoTIFF
+with rasterio.open(os.path.join(dir_file_proccesed_images, f"{resultado_name}"),
+                   'w',
+                   **metadata,
+                   ) as dst:
+    run_method(method.name, spectral_vrt, pancromatica_src, out=dst,
+               tile_size=int(os.getenv("tile_size_fusion", 2048)),
+               dtype=dtype_fusion,
+               workers=int(os.getenv("workers_fusion", 1)),
+               **method_params)
+print("Datos fusionados guardados")
 
 
 # ========== Evaluación de la Calidad de las Imágenes Fusionadas ==========
 
 print("========== Evaluación de la Calidad de las Imágenes Fusionadas ==========")
-# Original
+# Los ERGAS se calculan por ventanas a resolución completa; los demás índices de sewar son
+# globales y se calculan sobre vistas reducidas, así que solo aproximan los de la escena completa
 ix_rgb_bands = [3, 2, 1]
-# Dimensión espacial
-spatial_image_src = read_tif_image(dir_file_original_images_spatial, spatial_imagen_name)
-spatial_imagen = np.dstack([spatial_image_src.read(band) for band in ix_rgb_bands])
-# Dimensión espectral
-spectral_image_src = read_tif_image(dir_file_original_images_spectral, spectral_imagen_name)
-spectral_imagen = np.dstack([spectral_image_src.read(band) for band in ix_rgb_bands])
-# Resultado
 resultado_image_src = read_tif_image(dir_file_proccesed_images, resultado_name)
-resultado_imagen = np.dstack([resultado_image_src.read(band) for band in ix_rgb_bands])
+tile_size_evaluacion = int(os.getenv("tile_size_evaluacion", 2048))
+max_pixels_evaluacion = int(os.getenv("max_pixels_evaluacion", 2**22))
+
+# Vistas reducidas (filas, columnas, bandas); todas las imágenes tienen la resolución del dron
+spatial_imagen = np.moveaxis(preview_image(spatial_src, max_pixels_evaluacion)[[ix - 1 for ix in ix_rgb_bands]], 0, 2)
+resultado_imagen = np.moveaxis(preview_image(resultado_image_src, max_pixels_evaluacion)[[ix - 1 for ix in ix_rgb_bands]], 0, 2)
+spectral_imagen = np.moveaxis(preview_image(spectral_vrt, max_pixels_evaluacion), 0, 2)
+pancromatica_imagen = pancromatica_window(preview_image(spatial_src, max_pixels_evaluacion))
 
 nombre_resultado = os.getenv("name_evaluacion")
 
 # ERGAS espacial y espectral
-ergas_x = spectral_ERGAS(np.transpose(inter_spectral, (1, 2, 0)), resultado_imagen, 1/2, [1, 1, 1], 3)
+ergas_x, ergas_s = windowed_ERGAS(spectral_vrt, pancromatica_src, resultado_image_src, 1/2, [1, 1, 1], 3,
+                                  tile_size_evaluacion, fused_indexes=ix_rgb_bands, dtype=dtype_fusion)
 with open(os.path.join(dir_file_proccesed_images, f"{'ergas_espectral'}_{nombre_resultado}"), "w", newline="") as f:
     writer = csv.writer(f)
     writer.writerow([ergas_x])
 
-ergas_s = spatial_ERGAS(pancromatica, resultado_imagen, 1/2, [1, 1, 1], 3)
 with open(os.path.join(dir_file_proccesed_images, f"{'ergas_espacial'}_{nombre_resultado}"), "w", newline="") as f:
     writer = csv.writer(f)
     writer.writerow([ergas_s])
 
-# Evaluación con librería Sewar
-full_reference_espacial = test_full_references(spatial_imagen, resultado_imagen)
+# Evaluación con librería Sewar; la fila ERGAS se reemplaza por el valor exacto a resolución completa
+ergas_espacial = windowed_spectral_ERGAS(spatial_src, resultado_image_src, 1/2, [1, 1, 1], 3, tile_size_evaluacion,
+                                         ix_rgb_bands, ix_rgb_bands, dtype=dtype_fusion)
+full_reference_espacial = [(name, ergas_espacial if name == "ERGAS" else value)
+                           for name, value in test_full_references(spatial_imagen, resultado_imagen)]
 with open(os.path.join(dir_file_proccesed_images, f"{'full_reference_espacial'}_{nombre_resultado}"), "w", newline="") as f:
     writer = csv.writer(f)
     for test in full_reference_espacial:
         writer.writerow(test)
 
-full_reference_espectral = test_full_references(np.transpose(inter_spectral, (1, 2, 0)), resultado_imagen)
+full_reference_espectral = [(name, ergas_x if name == "ERGAS" else value)
+                            for name, value in test_full_references(spectral_imagen, resultado_imagen)]
 with open(os.path.join(dir_file_proccesed_images, f"{'full_reference_espectral'}__{nombre_resultado}"), "w", newline="") as f:
     writer = csv.writer(f)
     for test in full_reference_espectral:
         writer.writerow(test)
 
-full_no_reference = test_no_references(np.transpose(inter_spectral, (1, 2, 0)), pancromatica, resultado_imagen)
+full_no_reference = test_no_references(spectral_imagen, pancromatica_imagen, resultado_imagen)
 with open(os.path.join(dir_file_proccesed_images, f"{'full_no_reference'}__{nombre_resultado}"), "w", newline="") as f:
     writer = csv.writer(f)
     for test in full_no_reference:
-        writer.writerow(test)
\ No newline at end of file
+        writer.writerow(test)
+
+resultado_image_src.close()
+spectral_vrt.close()
+spectral_src.close()
+spatial_src.close()